@@ -0,0 +1,35 @@
+import argparse
+import json
+from pathlib import Path
+
+
+def compare(baseline: dict, candidate: dict, metric: str = 'wall_median') -> list[dict]:
+    rows = []
+    for scale, stages in candidate['scales'].items():
+        base_stages = baseline['scales'].get(scale, {})
+        for stage, stats in stages.items():
+            before = base_stages.get(stage, {}).get(metric)
+            after = stats.get(metric)
+            rows.append({
+                'scale': scale,
+                'stage': stage,
+                'before': before,
+                'after': after,
+                'ratio': round(after / before, 3) if before and after is not None else None,
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument('baseline', type=Path)
+    parser.add_argument('candidate', type=Path)
+    parser.add_argument('--metric', default='wall_median')
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    print(f"{args.metric}: {baseline['commit']} -> {candidate['commit']}")
+    for row in compare(baseline, candidate, args.metric):
+        ratio = '-' if row['ratio'] is None else f"{row['ratio']:.2f}x"
+        print(f"sf{row['scale']:>6} {row['stage']:<45} {row['before']!s:>10} {row['after']!s:>10} {ratio:>8}")
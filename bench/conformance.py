@@ -0,0 +1,77 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import etl.extract
+from bench.generate import generate
+from bench.run import CSV_FILES, bench_path
+from etl.engines import ENGINES, get_engine
+from etl.extract import extract_csv
+
+
+def run_engine(engine, raw: dict) -> dict:
+    # __wrapped__ skips the cache, both engines share the cache names
+    def call(name, *args):
+        started = time.perf_counter()
+        output = getattr(engine, name).__wrapped__(*args)
+        timings[name] = time.perf_counter() - started
+        return output
+
+    timings = {}
+    outputs = {}
+    outputs['transform_products'] = call(
+        'transform_products', raw['products'], raw['product_category_name_translation']
+    )
+    outputs['transform_cities'] = call('transform_cities', raw['cities'])
+    outputs['transform_orders'] = call(
+        'transform_orders', raw['orders'], raw['customers'], outputs['transform_cities']
+    )
+    outputs['transform_timestamps'] = call('transform_timestamps', raw['order_items'], raw['orders'])
+    outputs['transform_reviews'] = call('transform_reviews', raw['reviews'])
+    outputs['transform_order_items'] = call(
+        'transform_order_items', raw['order_items'], raw['sellers'], outputs['transform_cities'],
+        outputs['transform_orders'], outputs['transform_reviews'][['review_id', 'order_id']]
+    )
+    return {name: (output, timings[name]) for name, output in outputs.items()}
+
+
+def check(reference: dict, candidate: dict) -> list[str]:
+    failures = []
+    for name, (expected, expected_seconds) in reference.items():
+        actual, actual_seconds = candidate[name]
+        try:
+            pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True))
+            status = 'ok'
+        except AssertionError as e:
+            failures.append(f"{name}: {e}")
+            status = 'MISMATCH'
+        print(f"{name:<25} {status:<9} {expected_seconds:8.3f}s {actual_seconds:8.3f}s")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that a transform engine matches the pandas reference")
+    parser.add_argument('--engine', choices=[name for name in ENGINES if name != 'pandas'], default='duckdb')
+    parser.add_argument('--scale', type=float, default=0.05)
+    parser.add_argument('--data-dir', type=Path, default=bench_path / "data")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir / f"sf{args.scale:g}"
+    if not (data_dir / 'order_items.csv').exists():
+        generate(data_dir, args.scale)
+    etl.extract.data_path = data_dir
+    raw = {
+        name: extract_csv(file_name, cache=False, delimiter=delimiter)
+        for name, (file_name, delimiter) in CSV_FILES.items()
+    }
+
+    reference = run_engine(get_engine('pandas'), raw)
+    candidate = run_engine(get_engine(args.engine), raw)
+    print(f"{'transform':<25} {'status':<9} {'pandas':>9} {args.engine:>9}")
+    failures = check(reference, candidate)
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,188 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Row counts of the public Olist dataset, i.e. scale factor 1
+PUBLIC_ROWS = {
+    'orders': 99_441,
+    'sellers': 3_095,
+    'products': 32_951,
+    'cities': 5_573,
+}
+
+STATES = [
+    'AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+    'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO',
+]
+NAME_PARTS = [
+    'São', 'Santa', 'Santo', 'Nova', 'Bom', 'Porto', 'Rio', 'Campo', 'Vila', 'Boa',
+    'Paulo', 'Inês', 'Antônio', 'Esperança', 'Jesus', 'Alegre', 'Grande', 'Vista', 'Belém', 'Goiás',
+    'do Sul', 'de Minas', 'da Serra', 'do Norte', 'Paraíso', 'Conceição', 'José', 'Maringá', 'Itajaí', 'Açu',
+]
+CATEGORIES = [
+    ('beleza_saude', 'health_beauty'), ('esporte_lazer', 'sports_leisure'), ('cama_mesa_banho', 'bed_bath_table'),
+    ('moveis_decoracao', 'furniture_decor'), ('informatica_acessorios', 'computers_accessories'),
+    ('utilidades_domesticas', 'housewares'), ('relogios_presentes', 'watches_gifts'), ('telefonia', 'telephony'),
+    ('automotivo', 'auto'), ('brinquedos', 'toys'), ('cool_stuff', 'cool_stuff'), ('perfumaria', 'perfumery'),
+    ('bebes', 'baby'), ('eletronicos', 'electronics'), ('papelaria', 'stationery'), ('pet_shop', 'pet_shop'),
+]
+ORDER_STATUSES = ['delivered', 'shipped', 'canceled', 'unavailable', 'invoiced', 'processing']
+ORDER_STATUS_WEIGHTS = [0.97, 0.011, 0.006, 0.006, 0.004, 0.003]
+FIRST_PURCHASE = pd.Timestamp('2016-09-04')
+LAST_PURCHASE = pd.Timestamp('2018-10-17')
+
+
+def hex_ids(rng: np.random.Generator, n: int) -> np.ndarray:
+    return np.frombuffer(rng.bytes(16 * n).hex().encode(), dtype='S32').astype(str)
+
+
+def nullify(rng: np.random.Generator, values, share: float):
+    values = pd.Series(values)
+    return values.mask(rng.random(len(values)) < share)
+
+
+def generate_cities(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    first = rng.integers(0, 10, n)
+    second = rng.integers(10, len(NAME_PARTS), n)
+    names = pd.Series(np.array(NAME_PARTS, dtype=object)[first]) + ' ' + np.array(NAME_PARTS, dtype=object)[second]
+    # Some names repeat across states, like the real dataset
+    states = np.array(STATES)[rng.integers(0, len(STATES), n)]
+    cities = pd.DataFrame({'CITY': names, 'STATE': states}).drop_duplicates().reset_index(drop=True)
+    population = rng.lognormal(9.5, 1.3, len(cities)).astype('int64')
+    return pd.DataFrame({
+        'CITY': cities['CITY'],
+        'STATE': cities['STATE'],
+        'CAPITAL': (rng.random(len(cities)) < 0.005).astype(int),
+        'IBGE_RES_POP': nullify(rng, population, 0.001).astype('Int64'),
+        'IBGE_RES_POP_BRAS': population,
+        'IBGE_RES_POP_ESTR': (population * 0.001).astype('int64'),
+        'IBGE_DU': (population / 3).astype('int64'),
+        'IBGE_DU_URBAN': (population / 4).astype('int64'),
+        'IBGE_DU_RURAL': (population / 12).astype('int64'),
+        'IBGE_POP': population,
+        'AREA': rng.uniform(10, 5000, len(cities)).round(2),
+    })
+
+
+def customer_city_names(rng: np.random.Generator, cities: pd.DataFrame, n: int) -> pd.Series:
+    from unidecode import unidecode
+
+    weights = cities['IBGE_POP'].to_numpy(dtype='float64')
+    picks = rng.choice(len(cities), n, p=weights / weights.sum())
+    plain = np.array([unidecode(name).lower() for name in cities['CITY']], dtype=object)
+    names = pd.Series(plain[picks])
+    # A small share of free-text city names that do not match any city
+    unmatched = rng.random(n) < 0.02
+    names[unmatched] = names[unmatched] + ' do oeste'
+    return names
+
+
+def generate(output: Path, scale: float = 1.0, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    output.mkdir(parents=True, exist_ok=True)
+    n_orders = max(1, int(PUBLIC_ROWS['orders'] * scale))
+    n_sellers = max(1, int(PUBLIC_ROWS['sellers'] * scale))
+    n_products = max(1, int(PUBLIC_ROWS['products'] * scale))
+
+    cities = generate_cities(rng, PUBLIC_ROWS['cities'])
+    cities.to_csv(output / 'brazil_cities.csv', sep=';', index=False)
+
+    categories = pd.DataFrame(CATEGORIES, columns=['product_category_name', 'product_category_name_english'])
+    categories.to_csv(output / 'product_category_name_translation.csv', index=False)
+
+    product_ids = hex_ids(rng, n_products)
+    pd.DataFrame({
+        'product_id': product_ids,
+        'product_category_name': nullify(rng, categories['product_category_name'].to_numpy()[
+            rng.integers(0, len(categories), n_products)
+        ], 0.02),
+        'product_name_lenght': nullify(rng, rng.integers(5, 76, n_products), 0.02).astype('Int64'),
+        'product_description_lenght': nullify(rng, rng.integers(4, 3993, n_products), 0.02).astype('Int64'),
+        'product_photos_qty': nullify(rng, rng.integers(1, 20, n_products), 0.02).astype('Int64'),
+        'product_weight_g': nullify(rng, rng.integers(0, 40425, n_products), 0.0001).astype('Int64'),
+        'product_length_cm': nullify(rng, rng.integers(7, 105, n_products), 0.0001).astype('Int64'),
+        'product_height_cm': nullify(rng, rng.integers(2, 105, n_products), 0.0001).astype('Int64'),
+        'product_width_cm': nullify(rng, rng.integers(6, 118, n_products), 0.0001).astype('Int64'),
+    }).to_csv(output / 'products.csv', index=False)
+
+    seller_ids = hex_ids(rng, n_sellers)
+    pd.DataFrame({
+        'seller_id': seller_ids,
+        'seller_zip_code_prefix': rng.integers(1000, 99990, n_sellers),
+        'seller_city': customer_city_names(rng, cities, n_sellers),
+        'seller_state': np.array(STATES)[rng.integers(0, len(STATES), n_sellers)],
+    }).to_csv(output / 'sellers.csv', index=False)
+
+    customer_ids = hex_ids(rng, n_orders)
+    pd.DataFrame({
+        'customer_id': customer_ids,
+        'customer_unique_id': hex_ids(rng, n_orders),
+        'customer_zip_code_prefix': rng.integers(1000, 99990, n_orders),
+        'customer_city': customer_city_names(rng, cities, n_orders),
+        'customer_state': np.array(STATES)[rng.integers(0, len(STATES), n_orders)],
+    }).to_csv(output / 'customers.csv', index=False)
+
+    order_ids = hex_ids(rng, n_orders)
+    span = (LAST_PURCHASE - FIRST_PURCHASE).total_seconds()
+    purchased = FIRST_PURCHASE + pd.to_timedelta(np.sort(rng.uniform(0, span, n_orders)).round(), unit='s')
+    approved = purchased + pd.to_timedelta(rng.exponential(10 * 3600, n_orders).round(), unit='s')
+    carrier = approved + pd.to_timedelta(rng.exponential(3 * 86400, n_orders).round(), unit='s')
+    delivered = carrier + pd.to_timedelta(rng.exponential(9 * 86400, n_orders).round(), unit='s')
+    estimated = (purchased + pd.to_timedelta(rng.integers(10, 40, n_orders), unit='D')).normalize()
+    pd.DataFrame({
+        'order_id': order_ids,
+        'customer_id': customer_ids,
+        'order_status': rng.choice(ORDER_STATUSES, n_orders, p=ORDER_STATUS_WEIGHTS),
+        'order_purchase_timestamp': purchased,
+        'order_approved_at': nullify(rng, approved, 0.002),
+        'order_delivered_carrier_date': nullify(rng, carrier, 0.018),
+        'order_delivered_customer_date': nullify(rng, delivered, 0.03),
+        'order_estimated_delivery_date': estimated,
+    }).to_csv(output / 'orders.csv', index=False, date_format='%Y-%m-%d %H:%M:%S')
+
+    items_per_order = np.minimum(rng.geometric(0.88, n_orders), 21)
+    item_orders = np.repeat(np.arange(n_orders), items_per_order)
+    positions = np.arange(len(item_orders)) - np.repeat(np.cumsum(items_per_order) - items_per_order, items_per_order) + 1
+    n_items = len(item_orders)
+    shipping_limit = purchased[item_orders] + pd.to_timedelta(rng.integers(3, 8, n_items), unit='D')
+    pd.DataFrame({
+        'order_id': order_ids[item_orders],
+        'order_item_id': positions,
+        'product_id': product_ids[rng.integers(0, n_products, n_items)],
+        'seller_id': seller_ids[rng.integers(0, n_sellers, n_items)],
+        'shipping_limit_date': shipping_limit,
+        'price': (rng.lognormal(4.4, 1.0, n_items) * 100).round() / 100 + 0.85,
+        'freight_value': (rng.lognormal(2.9, 0.6, n_items) * 100).round() / 100,
+    }).to_csv(output / 'order_items.csv', index=False, date_format='%Y-%m-%d %H:%M:%S')
+
+    reviews_per_order = rng.choice([0, 1, 2], n_orders, p=[0.01, 0.985, 0.005])
+    review_orders = np.repeat(np.arange(n_orders), reviews_per_order)
+    n_reviews = len(review_orders)
+    created = (delivered[review_orders] + pd.to_timedelta(rng.integers(0, 5, n_reviews), unit='D')).normalize()
+    titles = np.array(['recomendo', 'Muito bom', 'Ótimo', 'Não recebi', 'bom'], dtype=object)
+    messages = np.array([
+        'Produto chegou antes do prazo, recomendo.', 'Entrega rápida', 'Não recebi o produto até agora',
+        'Muito bom, igual ao anúncio. Obrigado!', 'ok',
+    ], dtype=object)
+    pd.DataFrame({
+        'review_id': hex_ids(rng, n_reviews),
+        'order_id': order_ids[review_orders],
+        'review_score': rng.choice([1, 2, 3, 4, 5], n_reviews, p=[0.11, 0.03, 0.08, 0.19, 0.59]),
+        'review_comment_title': nullify(rng, titles[rng.integers(0, len(titles), n_reviews)], 0.88),
+        'review_comment_message': nullify(rng, messages[rng.integers(0, len(messages), n_reviews)], 0.59),
+        'review_creation_date': created,
+        'review_answer_timestamp': created + pd.to_timedelta(rng.integers(3600, 5 * 86400, n_reviews), unit='s'),
+    }).to_csv(output / 'order_reviews.csv', index=False, date_format='%Y-%m-%d %H:%M:%S')
+
+    print(f"Generated {n_orders} orders, {n_items} order items and {n_reviews} reviews in {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate Olist-shaped CSVs")
+    parser.add_argument('output', type=Path)
+    parser.add_argument('--scale', type=float, default=1.0, help="scale factor relative to the public dataset")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.output, args.scale, args.seed)
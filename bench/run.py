@@ -0,0 +1,159 @@
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+
+import etl.cache
+import etl.extract
+from bench.generate import generate
+from etl.engines import ENGINES, get_engine
+from etl.extract import extract_csv
+from etl.load import build_post_load, create_heap_tables, load_df_to_table
+from sql.dialects import get_dialect
+from sql.tables import table_model
+
+bench_path = Path(__file__).parent
+sqlite3.register_adapter(Decimal, str)
+
+CSV_FILES = {
+    'products': ("products.csv", None),
+    'product_category_name_translation': ("product_category_name_translation.csv", None),
+    'cities': ("brazil_cities.csv", ";"),
+    'orders': ("orders.csv", None),
+    'customers': ("customers.csv", None),
+    'reviews': ("order_reviews.csv", None),
+    'sellers': ("sellers.csv", None),
+    'order_items': ("order_items.csv", None),
+}
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(['git', *args], capture_output=True, text=True, cwd=bench_path).stdout.strip()
+    return {'commit': git('rev-parse', '--short', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--', 'etl'))}
+
+
+def timed(func, *args, repeat: int = 1, memory: bool = False, **kwargs) -> tuple[object, dict]:
+    walls, cpus, peaks = [], [], []
+    for _ in range(repeat):
+        if memory:
+            tracemalloc.start()
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        result = func(*args, **kwargs)
+        walls.append(time.perf_counter() - wall_started)
+        cpus.append(time.process_time() - cpu_started)
+        if memory:
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    stats = {
+        'wall_min': round(min(walls), 4),
+        'wall_median': round(statistics.median(walls), 4),
+        'cpu_median': round(statistics.median(cpus), 4),
+        'peak_alloc_bytes': max(peaks) if peaks else None,
+        'rows_out': len(result) if isinstance(result, pd.DataFrame) else None,
+    }
+    return result, stats
+
+
+def load_into_sqlite(tables: dict, strategy: str):
+    dialect, model = get_dialect('sqlite'), table_model()
+    with sqlite3.connect(':memory:') as conn:
+        cursor = conn.cursor()
+        create_heap_tables(cursor, dialect, model)
+        for table_name, df in tables.items():
+            load_df_to_table(cursor, df, table_name, strategy)
+        build_post_load(cursor, dialect, model)
+        conn.commit()
+
+
+def run_scale(
+    scale: float, data_dir: Path, repeat: int, memory: bool, strategies: list[str], engine: str = 'pandas'
+) -> dict:
+    transforms = get_engine(engine)
+    if not (data_dir / 'order_items.csv').exists():
+        generate(data_dir, scale)
+    etl.extract.data_path = data_dir
+    results = {}
+
+    raw = {}
+    for name, (file_name, delimiter) in CSV_FILES.items():
+        raw[name], results[f'extract_{name}'] = timed(
+            extract_csv, file_name, cache=False, delimiter=delimiter, repeat=repeat, memory=memory
+        )
+
+    def bench(name, func, *args):
+        # __wrapped__ skips the cache so every repeat does the full work
+        output, results[name] = timed(func.__wrapped__, *args, repeat=repeat, memory=memory)
+        return output
+
+    products = bench(
+        'transform_products', transforms.transform_products,
+        raw['products'], raw['product_category_name_translation']
+    )
+    cities = bench('transform_cities', transforms.transform_cities, raw['cities'])
+    orders = bench('transform_orders', transforms.transform_orders, raw['orders'], raw['customers'], cities)
+    timestamps = bench('transform_timestamps', transforms.transform_timestamps, raw['order_items'], raw['orders'])
+    reviews = bench('transform_reviews', transforms.transform_reviews, raw['reviews'])
+    order_items = bench(
+        'transform_order_items', transforms.transform_order_items,
+        raw['order_items'], raw['sellers'], cities, orders, reviews[['review_id', 'order_id']]
+    )
+
+    tables = {
+        'DIM_PRODUCTS': products,
+        'DIM_CITIES': cities,
+        'DIM_TIMESTAMP': timestamps,
+        'DIM_REVIEWS': reviews,
+        'FACT_ORDER_ITEMS': order_items,
+    }
+    for strategy in strategies:
+        _, results[f'load_{strategy}'] = timed(load_into_sqlite, tables, strategy, repeat=repeat, memory=memory)
+        results[f'load_{strategy}']['rows_out'] = sum(len(df) for df in tables.values())
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ETL stages on generated data")
+    parser.add_argument('--scale', type=float, nargs='+', default=[1.0], help="scale factors to run")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--memory', action='store_true', help="track peak allocations with tracemalloc")
+    parser.add_argument('--engine', choices=list(ENGINES), default='pandas')
+    parser.add_argument('--strategies', nargs='+', default=['executemany', 'values'])
+    parser.add_argument('--data-dir', type=Path, default=bench_path / "data")
+    parser.add_argument('--output', type=Path, help="result file (default: bench/results/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    revision = git_revision()
+    report = {
+        **revision,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'engine': args.engine,
+        'repeat': args.repeat,
+        'scales': {},
+    }
+    with tempfile.TemporaryDirectory() as cache_dir:
+        etl.cache.cache_path = Path(cache_dir)
+        for scale in args.scale:
+            print(f"Benchmarking scale factor {scale}")
+            report['scales'][str(scale)] = run_scale(
+                scale, args.data_dir / f"sf{scale:g}", args.repeat, args.memory, args.strategies, args.engine
+            )
+
+    output = args.output or bench_path / "results" / f"{revision['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Benchmark results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pyodbc
 from threading import Lock
 
+from etl.db import ConnectionPool
+
 
 class MSSQLConnector:
     _instance = None
@@ -13,7 +15,7 @@ class MSSQLConnector:
                     cls._instance = super(MSSQLConnector, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, server, database, username=None, password=None, trusted_connection=True):
+    def __init__(self, server, database, username=None, password=None, trusted_connection=True, pool_size=4):
         if hasattr(self, 'initialized'):
             return
 
@@ -35,6 +37,7 @@ class MSSQLConnector:
             )
 
         self.conn = pyodbc.connect(self.conn_str)
+        self.pool = ConnectionPool(lambda: pyodbc.connect(self.conn_str), max_size=pool_size)
         self.initialized = True
 
     def get_cursor(self):
@@ -46,6 +49,7 @@ class MSSQLConnector:
         if self.conn:
             self.conn.close()
             self.conn = None
+        self.pool.close()
 
 
 connector = MSSQLConnector(server='localhost', database='brazilian_ecommerce')
@@ -0,0 +1,144 @@
+import pandas as pd
+
+from etl.metrics import record
+
+# Summary tables computed from the typed fact frame. Keys and measures carry their SQL types so the
+# tables can be rendered through sql.dialects. Every table is keyed by a purchase-date bucket
+# (month YYYYMM or day YYYYMMDD), which is what lets an incremental run replace whole buckets.
+AGGREGATES = {
+    'AGG_SALES_SELLER_MONTH': {
+        'grain': 'item',
+        'bucket': 'month',
+        'keys': {'seller_id': 'VARCHAR(50)', 'seller_city_id': 'VARCHAR(50)', 'month': 'INT'},
+        'measures': {
+            'items': ('order_item_id', 'count', 'INT'),
+            'orders': ('order_id', 'nunique', 'INT'),
+            'revenue_cents': ('price', 'sum', 'BIGINT'),
+            'freight_cents': ('freight_value', 'sum', 'BIGINT'),
+        },
+    },
+    'AGG_SALES_CATEGORY_MONTH': {
+        'grain': 'item',
+        'bucket': 'month',
+        'keys': {'product_category': 'VARCHAR(255)', 'month': 'INT'},
+        'measures': {
+            'items': ('order_item_id', 'count', 'INT'),
+            'orders': ('order_id', 'nunique', 'INT'),
+            'revenue_cents': ('price', 'sum', 'BIGINT'),
+            'freight_cents': ('freight_value', 'sum', 'BIGINT'),
+        },
+    },
+    'AGG_SALES_CUSTOMER_CITY_DAY': {
+        'grain': 'item',
+        'bucket': 'day',
+        'keys': {'customer_city_id': 'VARCHAR(50)', 'day': 'INT'},
+        'measures': {
+            'items': ('order_item_id', 'count', 'INT'),
+            'orders': ('order_id', 'nunique', 'INT'),
+            'revenue_cents': ('price', 'sum', 'BIGINT'),
+            'freight_cents': ('freight_value', 'sum', 'BIGINT'),
+        },
+    },
+    'AGG_DELIVERY_STATE_MONTH': {
+        'grain': 'order',
+        'bucket': 'month',
+        'keys': {'customer_state': 'CHAR(2)', 'month': 'INT'},
+        'measures': {
+            'orders': ('order_id', 'count', 'INT'),
+            'delivered_orders': ('delivered', 'sum', 'INT'),
+            'late_orders': ('late', 'sum', 'INT'),
+            'lead_time_hours_sum': ('lead_time_hours', 'sum', 'FLOAT'),
+        },
+    },
+}
+
+# Measures whose totals over any table of that grain must match the fact table
+TOTALS = {
+    'item': ['items', 'revenue_cents', 'freight_cents'],
+    'order': ['orders'],
+}
+
+
+def hour_key_times(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values, format='%Y%m%d%H')
+
+
+def lookup(values: pd.Series, dim: pd.DataFrame, key: str, column: str) -> pd.Series:
+    return values.map(dim.drop_duplicates(subset=[key]).set_index(key)[column])
+
+
+def enrich(fact: pd.DataFrame, products: pd.DataFrame, orders: pd.DataFrame) -> pd.DataFrame:
+    purchase = pd.to_numeric(fact['order_purchase_timestamp']).astype('Int64')
+    purchased = hour_key_times(fact['order_purchase_timestamp'])
+    delivered = hour_key_times(fact['order_delivered_customer_timestamp'])
+    estimated = hour_key_times(fact['order_estimated_delivery_timestamp'])
+    return pd.DataFrame({
+        'order_id': fact['order_id'],
+        'order_item_id': fact['order_item_id'],
+        'seller_id': fact['seller_id'],
+        'seller_city_id': fact['seller_city_id'],
+        'customer_city_id': fact['customer_city_id'],
+        'price': fact['price'],
+        'freight_value': fact['freight_value'],
+        'month': purchase // 10_000,
+        'day': purchase // 100,
+        'product_category': lookup(fact['product_id'], products, 'product_id', 'product_category_name_english'),
+        'customer_state': lookup(fact['order_id'], orders, 'order_id', 'customer_state'),
+        'delivered': delivered.notna().astype('int64'),
+        'late': (delivered > estimated).astype('int64'),
+        'lead_time_hours': (delivered - purchased) / pd.Timedelta(hours=1),
+    })
+
+
+def aggregate(enriched: pd.DataFrame, spec: dict) -> pd.DataFrame:
+    rows = enriched.drop_duplicates(subset=['order_id']) if spec['grain'] == 'order' else enriched
+    grouped = rows.groupby(list(spec['keys']), dropna=False, observed=True, sort=True).agg(**{
+        name: (column, func) for name, (column, func, _) in spec['measures'].items()
+    })
+    return grouped.reset_index()
+
+
+def check_aggregates(aggregates: dict, enriched: pd.DataFrame):
+    fact_totals = {
+        'items': enriched['order_item_id'].count(),
+        'orders': enriched['order_id'].nunique(),
+        'revenue_cents': enriched['price'].sum(),
+        'freight_cents': enriched['freight_value'].sum(),
+    }
+    for name, df in aggregates.items():
+        for measure in TOTALS[AGGREGATES[name]['grain']]:
+            total = df[measure].sum()
+            if total != fact_totals[measure]:
+                raise ValueError(f"{name}.{measure} adds up to {total}, the fact table to {fact_totals[measure]}")
+
+
+def build_aggregates(
+    transformed_order_items: pd.DataFrame,
+    transformed_products: pd.DataFrame,
+    transformed_orders: pd.DataFrame,
+    names=None,
+) -> dict:
+    enriched = enrich(transformed_order_items, transformed_products, transformed_orders)
+    aggregates = {name: aggregate(enriched, AGGREGATES[name]) for name in names or AGGREGATES}
+    check_aggregates(aggregates, enriched)
+    record(aggregate_rows={name: len(df) for name, df in aggregates.items()})
+    return aggregates
+
+
+def aggregate_model(names=None) -> dict:
+    return {'columns': {
+        name: [(key, sql_type, True) for key, sql_type in AGGREGATES[name]['keys'].items()]
+        + [(measure, sql_type, True) for measure, (_, _, sql_type) in AGGREGATES[name]['measures'].items()]
+        for name in names or AGGREGATES
+    }}
+
+
+def orders_since_month_start(raw_orders: pd.DataFrame, changed_orders: pd.DataFrame) -> pd.DataFrame:
+    # Incremental runs reload whole months from the earliest changed order, so every refreshed bucket is complete
+    first = pd.to_datetime(changed_orders['order_purchase_timestamp']).min()
+    if pd.isna(first):
+        return changed_orders
+    start = first.to_period('M').to_timestamp()
+    selected = raw_orders[pd.to_datetime(raw_orders['order_purchase_timestamp']) >= start]
+    print(f"Selected {len(selected)} of {len(raw_orders)} orders purchased since {start:%Y-%m-%d}")
+    return selected
@@ -0,0 +1,128 @@
+import csv
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+
+from etl.schema import MONEY_COLUMNS, cents_to_decimal
+
+DEFAULT_BATCH_SIZE = 50_000
+DEFAULT_COMMIT_ROWS = 200_000
+MAX_ROWS_PER_VALUES = 1000
+MAX_PARAMS_PER_STATEMENT = 2099
+
+
+def to_db_values(values: pd.Series) -> list:
+    db_values = values.to_numpy(dtype=object, na_value=None).tolist()
+    if values.name in MONEY_COLUMNS:
+        return [cents_to_decimal(value) for value in db_values]
+    return db_values
+
+
+def encode_rows(df: pd.DataFrame, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list[tuple]]:
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size]
+        yield list(zip(*[to_db_values(batch[col]) for col in batch.columns]))
+
+
+def insert_sql(table_name: str, columns, rows: int = 1) -> str:
+    row = f"({', '.join(['?'] * len(columns))})"
+    return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES {', '.join([row] * rows)}"
+
+
+def load_executemany(cursor, table_name: str, columns, rows: list[tuple]):
+    cursor.executemany(insert_sql(table_name, columns), rows)
+
+
+def load_values(cursor, table_name: str, columns, rows: list[tuple]):
+    step = max(1, min(MAX_ROWS_PER_VALUES, MAX_PARAMS_PER_STATEMENT // len(columns)))
+    for start in range(0, len(rows), step):
+        statement_rows = rows[start:start + step]
+        params = [value for row in statement_rows for value in row]
+        cursor.execute(insert_sql(table_name, columns, len(statement_rows)), params)
+
+
+def table_columns(cursor, table_name: str) -> list[str]:
+    cursor.execute(f"SELECT TOP 0 * FROM {table_name};")
+    return [column[0] for column in cursor.description]
+
+
+def column_order(table_name: str, table: list[str], columns) -> list[int]:
+    positions = {column.lower(): i for i, column in enumerate(columns)}
+    if sorted(positions) != sorted(column.lower() for column in table):
+        raise ValueError(f"{table_name} has columns {', '.join(table)}, the frame has {', '.join(columns)}")
+    return [positions[column.lower()] for column in table]
+
+
+def load_bulk_file(cursor, table_name: str, columns, rows: list[tuple]):
+    if isinstance(cursor, sqlite3.Cursor):
+        raise ValueError("The bulk_file strategy needs a SQL Server connection")
+    # BULK INSERT maps fields to columns by position, so the file follows the table's column order
+    order = column_order(table_name, table_columns(cursor, table_name), columns)
+    with tempfile.NamedTemporaryFile(
+        'w', suffix='.csv', newline='', encoding='utf-8', delete=False
+    ) as staging:
+        csv.writer(staging, lineterminator='\n').writerows(
+            ['' if row[i] is None else int(row[i]) if isinstance(row[i], bool) else row[i] for i in order]
+            for row in rows
+        )
+    try:
+        cursor.execute(
+            f"BULK INSERT {table_name} FROM '{staging.name}' "
+            f"WITH (FORMAT = 'CSV', CODEPAGE = '65001', ROWTERMINATOR = '0x0a', TABLOCK)"
+        )
+    finally:
+        Path(staging.name).unlink(missing_ok=True)
+
+
+STRATEGIES = {
+    'executemany': load_executemany,
+    'values': load_values,
+    'bulk_file': load_bulk_file,
+}
+
+
+class LoadStats:
+    def __init__(self, table_name: str, strategy: str):
+        self.table_name = table_name
+        self.strategy = strategy
+        self.rows = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'table': self.table_name,
+            'strategy': self.strategy,
+            'rows': self.rows,
+            'batches': self.batches,
+            'seconds': round(self.seconds, 3),
+            'rows_per_sec': round(self.rows_per_sec, 1),
+        }
+
+
+def bulk_load(
+    cursor,
+    df: pd.DataFrame,
+    table_name: str,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    stats: LoadStats = None,
+) -> LoadStats:
+    load_batch = STRATEGIES[strategy]
+    stats = stats or LoadStats(table_name, strategy)
+    columns = list(df.columns)
+    started = time.perf_counter()
+    for rows in encode_rows(df, batch_size):
+        load_batch(cursor, table_name, columns, rows)
+        stats.rows += len(rows)
+        stats.batches += 1
+    stats.seconds += time.perf_counter() - started
+    return stats
@@ -0,0 +1,204 @@
+import ast
+import hashlib
+import importlib
+import os
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from threading import Lock
+
+import pandas as pd
+
+from etl.metrics import record
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+cache_path = Path(os.environ.get("ETL_CACHE_PATH", Path(__file__).parent.parent / "cache"))
+max_cache_bytes = int(os.environ.get("ETL_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+_refresh = ContextVar("cache_refresh", default=False)
+_parse_lock = Lock()
+
+
+@contextmanager
+def refreshing(enabled: bool = True):
+    token = _refresh.set(enabled)
+    try:
+        yield
+    finally:
+        _refresh.reset(token)
+
+
+def file_fingerprint(path: Path) -> str:
+    stat = path.stat()
+    return f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    digest = hashlib.sha1()
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(repr([str(dtype) for dtype in df.dtypes]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def imported_modules(source: str) -> set[str]:
+    # ast.parse is not thread-safe on Python 3.11, and cached stages run on the pipeline's threads
+    with _parse_lock:
+        tree = ast.parse(source)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names.add(node.module)
+        elif isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+    return {name for name in names if name.split('.')[0] == 'etl'}
+
+
+def module_dependencies(module_name: str) -> dict[str, Path]:
+    # The module and every etl module it imports, followed transitively
+    found, pending = {}, [module_name]
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        module_file = getattr(sys.modules.get(name) or importlib.import_module(name), '__file__', None)
+        if module_file is None:
+            continue
+        found[name] = Path(module_file)
+        pending.extend(imported_modules(found[name].read_text()))
+    return dict(sorted(found.items()))
+
+
+def source_fingerprint(func) -> str:
+    digest = hashlib.sha1()
+    for name, module_file in module_dependencies(func.__module__).items():
+        digest.update(name.encode())
+        digest.update(module_file.read_bytes())
+    return digest.hexdigest()
+
+
+def cache_key(*parts) -> str:
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def entry_path(name: str, key: str) -> Path:
+    suffix = ".arrow" if pa is not None else ".pkl"
+    return cache_path / f"{name}-{key}{suffix}"
+
+
+def _write_arrow(df: pd.DataFrame, path: Path):
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    object_columns = [str(col) for col in df.columns if df[col].dtype == object]
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"etl.object_columns"] = ",".join(object_columns).encode()
+    feather.write_feather(table.replace_schema_metadata(metadata), path, compression="uncompressed")
+
+
+def _read_arrow(path: Path, columns: list[str] = None) -> pd.DataFrame:
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    df = table.to_pandas(integer_object_nulls=True)
+    object_columns = (table.schema.metadata or {}).get(b"etl.object_columns", b"").decode().split(",")
+    for col in df.columns:
+        if col in object_columns and df[col].dtype != object:
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
+
+
+def read_entry(name: str, key: str, columns: list[str] = None) -> pd.DataFrame | None:
+    path = entry_path(name, key)
+    if _refresh.get() or not path.exists():
+        record(cache='refresh' if _refresh.get() else 'miss')
+        return None
+    record(cache='hit')
+    print(f"Loading cached data from {path}")
+    os.utime(path)
+    if path.suffix == ".arrow":
+        return _read_arrow(path, columns)
+    df = pd.read_pickle(path)
+    return df if columns is None else df[columns]
+
+
+def write_entry(name: str, key: str, df: pd.DataFrame):
+    path = entry_path(name, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    if path.suffix == ".arrow":
+        _write_arrow(df, tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    evict(keep=path)
+
+
+def cache_entries() -> pd.DataFrame:
+    rows = []
+    for path in [*cache_path.glob("*-*.arrow"), *cache_path.glob("*-*.pkl")]:
+        name, key = path.stem.rsplit("-", 1)
+        stat = path.stat()
+        rows.append({
+            'name': name,
+            'key': key,
+            'size_bytes': stat.st_size,
+            'last_used': pd.Timestamp(stat.st_mtime, unit='s'),
+            'path': path,
+        })
+    df = pd.DataFrame(rows, columns=['name', 'key', 'size_bytes', 'last_used', 'path'])
+    return df.sort_values('last_used', ascending=False).reset_index(drop=True)
+
+
+def evict(max_bytes: int = None, keep: Path = None):
+    max_bytes = max_cache_bytes if max_bytes is None else max_bytes
+    entries = cache_entries()
+    total = entries['size_bytes'].sum()
+    for entry in entries.iloc[::-1].itertuples():
+        if total <= max_bytes:
+            break
+        if entry.path == keep:
+            continue
+        entry.path.unlink(missing_ok=True)
+        total -= entry.size_bytes
+        print(f"Evicted cache entry {entry.path.name}")
+
+
+def purge_cache(name: str = None) -> int:
+    entries = cache_entries()
+    if name is not None:
+        entries = entries[entries['name'] == name]
+    for path in entries['path']:
+        path.unlink(missing_ok=True)
+    return len(entries)
+
+
+def cached(name: str, version: int = 1):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            inputs = [
+                frame_fingerprint(arg) if isinstance(arg, pd.DataFrame) else repr(arg)
+                for arg in list(args) + [kwargs[k] for k in sorted(kwargs)]
+            ]
+            key = cache_key(name, version, source_fingerprint(func), *sorted(kwargs), *inputs)
+            df = read_entry(name, key)
+            if df is not None:
+                return df
+            df = func(*args, **kwargs)
+            write_entry(name, key, df)
+            return df
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "purge":
+        removed = purge_cache(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"Removed {removed} cache entries")
+    else:
+        entries = cache_entries()
+        print(entries[['name', 'key', 'size_bytes', 'last_used']].to_string(index=False))
+        print(f"Total: {entries['size_bytes'].sum()} bytes (limit {max_cache_bytes})")
@@ -0,0 +1,57 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+FINGERPRINT_PRIME = np.uint64(1_000_003)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def per_order(df: pd.DataFrame, order_ids: pd.Index) -> np.ndarray:
+    # Summing (with wrap-around) keeps an order's hash independent of the order of its rows
+    positions = order_ids.get_indexer(df['order_id'])
+    known = positions >= 0
+    sums = np.zeros(len(order_ids), dtype='uint64')
+    np.add.at(sums, positions[known], row_hashes(df)[known])
+    return sums
+
+
+def order_fingerprints(
+    raw_orders: pd.DataFrame,
+    raw_order_items: pd.DataFrame | Iterable[pd.DataFrame],
+    raw_reviews: pd.DataFrame,
+) -> pd.DataFrame:
+    # One hash per order over its order row, its items and its reviews, so any late update shows up
+    orders = raw_orders.drop_duplicates(subset=['order_id']).reset_index(drop=True)
+    order_ids = pd.Index(orders['order_id'])
+    items = [raw_order_items] if isinstance(raw_order_items, pd.DataFrame) else raw_order_items
+    with np.errstate(over='ignore'):
+        item_hashes = np.zeros(len(order_ids), dtype='uint64')
+        for chunk in items:
+            item_hashes += per_order(chunk, order_ids)
+        fingerprints = (
+            (row_hashes(orders) * FINGERPRINT_PRIME + item_hashes) * FINGERPRINT_PRIME
+            + per_order(raw_reviews, order_ids)
+        )
+    return pd.DataFrame({'order_id': orders['order_id'], 'fingerprint': fingerprints.view('int64')})
+
+
+def changed_fingerprints(fingerprints: pd.DataFrame, loaded_fingerprints: pd.DataFrame) -> pd.DataFrame:
+    positions = pd.Index(loaded_fingerprints['order_id']).get_indexer(fingerprints['order_id'])
+    found = positions >= 0
+    loaded = np.zeros(len(positions), dtype='int64')
+    loaded[found] = loaded_fingerprints['fingerprint'].to_numpy(dtype='int64')[positions[found]]
+    changed = ~found | (loaded != fingerprints['fingerprint'].to_numpy())
+    return fingerprints[changed]
+
+
+def changed_orders(
+    raw_orders: pd.DataFrame, fingerprints: pd.DataFrame, loaded_fingerprints: pd.DataFrame
+) -> pd.DataFrame:
+    changed = changed_fingerprints(fingerprints, loaded_fingerprints)
+    selected = raw_orders[raw_orders['order_id'].isin(pd.Index(changed['order_id']))]
+    print(f"Selected {len(selected)} of {len(raw_orders)} orders that are new or changed since the last load")
+    return selected
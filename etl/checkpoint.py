@@ -0,0 +1,113 @@
+import hashlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from etl.bulk import DEFAULT_BATCH_SIZE, DEFAULT_COMMIT_ROWS, LoadStats, bulk_load
+from etl.db import Cursor, MISSING_TABLE_ERRORS, fast_executemany
+from etl.load import LOAD_ORDER
+from etl.metrics import measure, record
+from sql.merge_tables import (
+    CLEAR_CHECKPOINTS_SQL, READ_CHECKPOINTS_SQL, WRITE_CHECKPOINT_SQL, WRITE_CHECKPOINT_SQLITE_SQL
+)
+
+
+class VerificationError(ValueError):
+    pass
+
+
+def load_run_id(tables: dict) -> str:
+    # Identifies the data being loaded, so a restart only resumes a load of the same frames
+    digest = hashlib.sha1()
+    for table_name, df in tables.items():
+        digest.update(table_name.encode())
+        digest.update(repr(list(df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:32]
+
+
+def read_checkpoints(cursor: Cursor, run_id: str) -> dict:
+    try:
+        rows = cursor.execute(READ_CHECKPOINTS_SQL, (run_id,)).fetchall()
+    except MISSING_TABLE_ERRORS:
+        return {}
+    return {table_name: (rows_loaded, batches) for table_name, rows_loaded, batches in rows}
+
+
+def write_checkpoint(cursor: Cursor, run_id: str, table_name: str, rows_loaded: int, batches: int):
+    sql = WRITE_CHECKPOINT_SQLITE_SQL if isinstance(cursor, sqlite3.Cursor) else WRITE_CHECKPOINT_SQL
+    cursor.execute(sql, (run_id, table_name, rows_loaded, batches))
+
+
+def clear_checkpoints(cursor: Cursor, run_id: str):
+    # Once the load has committed a rerun of the same data starts over instead of resuming
+    cursor.execute(CLEAR_CHECKPOINTS_SQL, (run_id,))
+
+
+def load_table_resumable(
+    pool,
+    df: pd.DataFrame,
+    table_name: str,
+    run_id: str,
+    checkpoint: tuple[int, int] = (0, 0),
+    commit_rows: int = DEFAULT_COMMIT_ROWS,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> LoadStats:
+    rows_loaded, batches = checkpoint
+    stats = LoadStats(table_name, strategy)
+    with measure(f"load_{table_name}", 'load', len(df) - rows_loaded), pool.connection() as conn:
+        cursor = conn.cursor()
+        fast_executemany(cursor)
+        if rows_loaded:
+            print(f"Resuming {table_name} after {rows_loaded} rows ({batches} batches)")
+        for start in range(rows_loaded, len(df), commit_rows):
+            batch = df.iloc[start:start + commit_rows]
+            bulk_load(cursor, batch, table_name, strategy, batch_size, stats)
+            batches += 1
+            # The checkpoint commits with the rows it describes
+            write_checkpoint(cursor, run_id, table_name, start + len(batch), batches)
+            conn.commit()
+        print(f"{table_name} loaded successfully ({stats.rows} rows, {stats.rows_per_sec:.0f} rows/s)")
+        record(**stats.as_dict(), resumed_from_row=rows_loaded, commits=batches - checkpoint[1])
+    return stats
+
+
+def load_star_schema_resumable(
+    pool,
+    tables: dict,
+    run_id: str,
+    checkpoints: dict,
+    commit_rows: int = DEFAULT_COMMIT_ROWS,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> list[LoadStats]:
+    stats = []
+    for wave in LOAD_ORDER:
+        with ThreadPoolExecutor(max_workers=min(pool.max_size, len(wave))) as executor:
+            futures = [
+                executor.submit(
+                    load_table_resumable, pool, tables[table_name], table_name, run_id,
+                    checkpoints.get(table_name, (0, 0)), commit_rows, strategy, batch_size
+                )
+                for table_name in wave
+            ]
+            stats += [future.result() for future in futures]
+    return stats
+
+
+def verify_row_counts(cursor: Cursor, tables: dict) -> dict:
+    counts = {}
+    with measure('verify_row_counts', 'load'):
+        for table_name, df in tables.items():
+            counts[table_name] = cursor.execute(f"SELECT COUNT(*) FROM {table_name};").fetchone()[0]
+        record(row_counts=counts)
+    mismatches = [
+        f"{table_name} has {counts[table_name]} rows, expected {len(df)}"
+        for table_name, df in tables.items() if counts[table_name] != len(df)
+    ]
+    if mismatches:
+        raise VerificationError("; ".join(mismatches))
+    print(f"Verified row counts of {len(tables)} tables")
+    return counts
@@ -0,0 +1,73 @@
+from functools import lru_cache
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+from unidecode import unidecode
+
+from etl.cache import frame_fingerprint
+from etl.metrics import record
+from etl.schema import ID
+
+
+@lru_cache(maxsize=None)
+def normalize_name(name: str) -> str:
+    return unidecode(name).lower()
+
+
+def normalize_names(names: pd.Series) -> pd.Series:
+    codes, uniques = pd.factorize(names)
+    normalized = np.array([normalize_name(name) for name in uniques] + [None], dtype=object)
+    return pd.Series(normalized[codes], index=names.index, dtype=object)
+
+
+class CityIndex:
+    def __init__(self, cities: pd.DataFrame):
+        names = normalize_names(cities['city_name'])
+        states = cities['state_code'].astype(object)
+        city_ids = cities['city_id'].to_numpy(dtype=object)
+
+        first = ~names.duplicated()
+        self.by_name = pd.Series(city_ids[first.to_numpy()], index=pd.Index(names[first]))
+        first = ~pd.MultiIndex.from_arrays([names, states]).duplicated()
+        self.by_name_state = pd.Series(
+            city_ids[first], index=pd.MultiIndex.from_arrays([names[first], states[first]])
+        )
+        self.match_rates = {}
+
+    def resolve(
+        self,
+        names: pd.Series,
+        states: pd.Series = None,
+        normalize: bool = True,
+        label: str = 'cities',
+    ) -> pd.Series:
+        keys = normalize_names(names) if normalize else names.astype(object)
+        if states is None:
+            positions = self.by_name.index.get_indexer(keys)
+            lookup = self.by_name
+        else:
+            positions = self.by_name_state.index.get_indexer(
+                pd.MultiIndex.from_arrays([keys, states.astype(object)])
+            )
+            lookup = self.by_name_state
+
+        city_ids = np.append(lookup.to_numpy(dtype=object), None)[positions]
+        known = names.notna().to_numpy()
+        matched = int((positions[known] >= 0).sum())
+        self.match_rates[label] = matched / known.sum() if known.any() else 1.0
+        print(f"Resolved {matched} of {known.sum()} {label} ({self.match_rates[label]:.1%})")
+        record(**{f"match_rate_{label.replace(' ', '_')}": round(self.match_rates[label], 4)})
+        return pd.Series(city_ids, index=names.index, dtype=ID)
+
+
+_indexes = {}
+_indexes_lock = Lock()
+
+
+def city_index(transformed_cities: pd.DataFrame) -> CityIndex:
+    key = frame_fingerprint(transformed_cities[['city_id', 'city_name', 'state_code']])
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = CityIndex(transformed_cities)
+        return _indexes[key]
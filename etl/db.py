@@ -0,0 +1,54 @@
+import sqlite3
+from contextlib import contextmanager
+from queue import Empty, Queue
+from threading import BoundedSemaphore
+
+try:
+    import pyodbc
+except ImportError:
+    # Without an ODBC driver manager only the SQLite stand-in is available
+    pyodbc = None
+
+Cursor = pyodbc.Cursor if pyodbc is not None else sqlite3.Cursor
+
+# What reading a control table that does not exist yet raises
+MISSING_TABLE_ERRORS = (sqlite3.OperationalError,) + ((pyodbc.ProgrammingError,) if pyodbc is not None else ())
+
+
+def fast_executemany(cursor):
+    if pyodbc is not None and isinstance(cursor, pyodbc.Cursor):
+        cursor.fast_executemany = True
+    return cursor
+
+
+class ConnectionPool:
+    def __init__(self, connect, max_size=4):
+        self._connect = connect
+        self._idle = Queue()
+        self._slots = BoundedSemaphore(max_size)
+        self.max_size = max_size
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except Exception:
+                conn.rollback()
+                conn.close()
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
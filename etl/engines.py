@@ -0,0 +1,16 @@
+import importlib
+
+# Every engine module exposes the same transform_* functions as etl.transform, the pandas reference
+ENGINES = {
+    'pandas': 'etl.transform',
+    'duckdb': 'etl.transform_duckdb',
+}
+
+
+def get_engine(name: str = 'pandas'):
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine '{name}', expected one of: {', '.join(ENGINES)}")
+    try:
+        return importlib.import_module(ENGINES[name])
+    except ImportError as e:
+        raise ImportError(f"The {name} engine needs the {e.name} package") from e
@@ -1,24 +1,46 @@
+import os
+
 import pandas as pd
 from pathlib import Path
+from typing import Iterator
+
+from etl.cache import cache_key, file_fingerprint, read_entry, source_fingerprint, write_entry
+from etl.schema import SCHEMAS, apply_schema, read_options
 
-cache_path = Path(__file__).parent.parent / "cache"
-data_path = Path(__file__).parent.parent / "data"
+data_path = Path(os.environ.get("ETL_DATA_PATH", Path(__file__).parent.parent / "data"))
 
 
 def extract_csv(
-    file_path: str, cache: bool = True, delimiter = None
+    file_path: str, cache: bool = True, delimiter = None, columns: list[str] = None
 ) -> pd.DataFrame:
-    cache_file = cache_path / f"{Path(file_path).stem}.pkl"
-    if cache and cache_file.exists():
-        print(f"Loading cached data from {cache_file}")
-        return pd.read_pickle(cache_file)
-
+    name = Path(file_path).stem
     file_path = data_path / file_path
+    options = read_options(name)
+    key = cache_key(name, file_fingerprint(file_path), delimiter, SCHEMAS.get(name), source_fingerprint(apply_schema))
+    if cache:
+        df = read_entry(name, key, columns)
+        if df is not None:
+            return df
+
     print(f"Extracting data from {file_path}")
-    df = pd.read_csv(file_path, na_values=[''], delimiter=delimiter)
+    df = apply_schema(name, pd.read_csv(file_path, na_values=[''], delimiter=delimiter, **options))
     if cache:
-        df.to_pickle(cache_file)
-    return df
+        write_entry(name, key, df)
+    return df if columns is None else df[columns]
+
+
+def extract_csv_chunks(
+    file_path: str, chunksize: int = 100_000, delimiter = None, columns: list[str] = None
+) -> Iterator[pd.DataFrame]:
+    name = Path(file_path).stem
+    file_path = data_path / file_path
+    print(f"Streaming data from {file_path} in chunks of {chunksize} rows")
+    with pd.read_csv(
+        file_path, na_values=[''], delimiter=delimiter, usecols=columns, chunksize=chunksize,
+        **read_options(name, columns)
+    ) as reader:
+        for chunk in reader:
+            yield apply_schema(name, chunk)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+import pandas as pd
+
+from etl.bulk import DEFAULT_BATCH_SIZE, LoadStats, bulk_load
+from etl.db import Cursor, MISSING_TABLE_ERRORS
+from etl.load import LOAD_ORDER
+from etl.metrics import measure, record
+from sql.merge_tables import (
+    ORDER_TABLES, READ_FINGERPRINTS_SQL, READ_WATERMARK_SQL, WRITE_WATERMARK_SQL, create_staging_sql,
+    drop_staging_sql, merge_sql, prune_sql, staging_table
+)
+
+WATERMARK_NAME = 'order_purchase_timestamp'
+
+
+def read_watermark(cursor: Cursor, name: str = WATERMARK_NAME) -> pd.Timestamp | None:
+    try:
+        row = cursor.execute(READ_WATERMARK_SQL, (name,)).fetchone()
+    except MISSING_TABLE_ERRORS:
+        return None
+    return pd.Timestamp(row[0]) if row else None
+
+
+def write_watermark(cursor: Cursor, value: pd.Timestamp, name: str = WATERMARK_NAME):
+    cursor.execute(WRITE_WATERMARK_SQL, (name, value.isoformat()))
+
+
+def read_fingerprints(cursor: Cursor) -> pd.DataFrame:
+    try:
+        rows = cursor.execute(READ_FINGERPRINTS_SQL).fetchall()
+    except MISSING_TABLE_ERRORS:
+        rows = []
+    return pd.DataFrame([tuple(row) for row in rows], columns=['order_id', 'fingerprint'])
+
+
+def orders_watermark(raw_orders: pd.DataFrame) -> pd.Timestamp | None:
+    value = pd.to_datetime(raw_orders['order_purchase_timestamp']).max()
+    return None if pd.isna(value) else value
+
+
+def for_orders(df: pd.DataFrame, orders: pd.DataFrame) -> pd.DataFrame:
+    return df[df['order_id'].isin(pd.Index(orders['order_id'].unique()))]
+
+
+def stage_df(
+    cursor: Cursor,
+    df: pd.DataFrame,
+    table_name: str,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> LoadStats:
+    cursor.execute(create_staging_sql(table_name))
+    return bulk_load(cursor, df, staging_table(table_name), strategy, batch_size)
+
+
+def merge_staged(cursor: Cursor, stats: LoadStats, table_name: str, columns, prune: bool = False):
+    cursor.execute(merge_sql(table_name, columns))
+    merged = cursor.rowcount
+    removed = 0
+    if prune:
+        cursor.execute(prune_sql(table_name))
+        removed = cursor.rowcount
+    cursor.execute(drop_staging_sql(table_name))
+    print(f"{table_name} merged successfully ({stats.rows} staged rows, {merged} rows affected, {removed} removed)")
+    record(**stats.as_dict(), rows_merged=merged, rows_removed=removed)
+
+
+def merge_df_into_table(
+    cursor: Cursor,
+    df: pd.DataFrame,
+    table_name: str,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    prune: bool = False,
+):
+    stats = stage_df(cursor, df, table_name, strategy, batch_size)
+    merge_staged(cursor, stats, table_name, list(df.columns), prune)
+    return stats
+
+
+def load_incremental(
+    cursor: Cursor,
+    tables: dict,
+    watermark: pd.Timestamp | None,
+    fingerprints: pd.DataFrame = None,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+):
+    if fingerprints is not None:
+        # Staged up front, the changed orders scope which of their rows the merges below may delete
+        with measure('stage_ETL_ORDER_FINGERPRINT', 'load', len(fingerprints)):
+            fingerprint_stats = stage_df(cursor, fingerprints, 'ETL_ORDER_FINGERPRINT', strategy, batch_size)
+    for wave in LOAD_ORDER:
+        for table_name in wave:
+            prune = fingerprints is not None and table_name in ORDER_TABLES
+            with measure(f"merge_{table_name}", 'load', len(tables[table_name])):
+                merge_df_into_table(cursor, tables[table_name], table_name, strategy, batch_size, prune)
+    if fingerprints is not None:
+        with measure('merge_ETL_ORDER_FINGERPRINT', 'load', len(fingerprints)):
+            merge_staged(cursor, fingerprint_stats, 'ETL_ORDER_FINGERPRINT', list(fingerprints.columns))
+    if watermark is not None:
+        write_watermark(cursor, watermark)
+        print(f"Watermark advanced to {watermark}")
@@ -0,0 +1,22 @@
+import pandas as pd
+
+from etl.metrics import record
+
+
+def first_per_key(df: pd.DataFrame, key) -> pd.DataFrame:
+    return df.drop_duplicates(subset=key, keep='first')
+
+
+def join(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    on,
+    how: str = 'left',
+    validate: str = 'm:1',
+    label: str = None,
+) -> pd.DataFrame:
+    # validate raises MergeError from the key check, before any fanned-out frame is built
+    merged = left.merge(right, on=on, how=how, validate=validate)
+    fan_out = len(merged) / len(left) if len(left) else 1.0
+    record(**{f"fan_out_{label or on}": round(fan_out, 4)})
+    return merged
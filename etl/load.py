@@ -1,20 +1,170 @@
-import pyodbc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
 import pandas as pd
 
+from etl.aggregates import AGGREGATES, TOTALS
+from etl.bulk import DEFAULT_BATCH_SIZE, LoadStats, bulk_load
+from etl.db import Cursor, fast_executemany
+from etl.metrics import count_rows, measure, record
+from etl.validate import IntegrityError
+from sql.dialects import create_heap_sql, drop_tables_sql, post_load_sql
+
 
 def load_sql(
-    cursor: pyodbc.Cursor, sql: str,
+    cursor: Cursor, sql: str,
 ):
     cursor.execute(sql)
 
 
 def load_df_to_table(
-    cursor: pyodbc.Cursor,
+    cursor: Cursor,
     df: pd.DataFrame,
     table_name: str,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> LoadStats:
+    stats = bulk_load(cursor, df, table_name, strategy, batch_size)
+    print(f"{table_name} loaded successfully ({stats.rows} rows, {stats.rows_per_sec:.0f} rows/s)")
+    record(**stats.as_dict())
+    return stats
+
+
+def load_chunks_to_table(
+    cursor: Cursor,
+    chunks: Iterable[pd.DataFrame],
+    table_name: str,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> LoadStats:
+    stats = LoadStats(table_name, strategy)
+    for chunk in chunks:
+        bulk_load(cursor, chunk, table_name, strategy, batch_size, stats)
+    print(f"{table_name} loaded successfully ({stats.rows} rows, {stats.rows_per_sec:.0f} rows/s)")
+    record(**stats.as_dict())
+    return stats
+
+
+LOAD_ORDER = [
+    ['DIM_PRODUCTS', 'DIM_CITIES', 'DIM_TIMESTAMP', 'DIM_REVIEWS'],
+    ['FACT_ORDER_ITEMS'],
+]
+
+
+def load_table_on_connection(
+    pool,
+    data: pd.DataFrame | Iterable[pd.DataFrame],
+    table_name: str,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> LoadStats:
+    with measure(f"load_{table_name}", 'load', count_rows(data)), pool.connection() as conn:
+        cursor = conn.cursor()
+        fast_executemany(cursor)
+        if isinstance(data, pd.DataFrame):
+            stats = load_df_to_table(cursor, data, table_name, strategy, batch_size)
+        else:
+            stats = load_chunks_to_table(cursor, data, table_name, strategy, batch_size)
+        conn.commit()
+    return stats
+
+
+def load_tables_concurrently(
+    pool,
+    tables: dict,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> list[LoadStats]:
+    with ThreadPoolExecutor(max_workers=min(pool.max_size, len(tables))) as executor:
+        futures = [
+            executor.submit(load_table_on_connection, pool, data, table_name, strategy, batch_size)
+            for table_name, data in tables.items()
+        ]
+        return [future.result() for future in futures]
+
+
+def load_star_schema(
+    pool,
+    tables: dict,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> list[LoadStats]:
+    stats = []
+    for wave in LOAD_ORDER:
+        stats += load_tables_concurrently(
+            pool, {table_name: tables[table_name] for table_name in wave}, strategy, batch_size
+        )
+    return stats
+
+
+def create_heap_tables(cursor: Cursor, dialect: dict, model: dict):
+    with measure('create_heap_tables', 'load'):
+        for sql in drop_tables_sql(dialect, model) + create_heap_sql(dialect, model):
+            load_sql(cursor, sql)
+
+
+def check_foreign_keys(cursor: Cursor, statements: list[str], foreign_keys: dict):
+    violations = []
+    for sql, (constraint, (table, column, ref_table, ref_column)) in zip(statements, foreign_keys.items()):
+        cursor.execute(sql)
+        count = cursor.fetchone()[0]
+        if count:
+            violations.append({
+                'constraint': constraint,
+                'column': column,
+                'references': f"{ref_table}({ref_column})",
+                'violations': count,
+                'sample': [],
+            })
+    if violations:
+        raise IntegrityError(violations)
+
+
+def build_post_load(cursor: Cursor, dialect: dict, model: dict):
+    for phase, statements in post_load_sql(dialect, model).items():
+        with measure(f"post_load_{phase}", 'load') as stage:
+            if phase == 'foreign_keys' and not dialect['enforces_foreign_keys']:
+                check_foreign_keys(cursor, statements, model['foreign_keys'])
+            else:
+                for sql in statements:
+                    load_sql(cursor, sql)
+            stage['statements'] = len(statements)
+        print(f"Built {phase} ({len(statements)} statements) in {stage['wall_seconds']:.2f}s")
+
+
+def refresh_aggregates(
+    cursor: Cursor,
+    aggregates: dict,
+    strategy: str = 'executemany',
+    batch_size: int = DEFAULT_BATCH_SIZE,
 ):
-    columns = ', '.join(df.columns)
-    placeholders = ', '.join(['?'] * len(df.columns))
-    insert_sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-    cursor.executemany(insert_sql, df.values.tolist())
-    print(f"{table_name} loaded successfully")
+    # Frames hold complete buckets from their first bucket on, so those rows are replaced wholesale
+    for table_name, df in aggregates.items():
+        bucket = AGGREGATES[table_name]['bucket']
+        with measure(f"refresh_{table_name}", 'load', len(df)):
+            start = df[bucket].min()
+            if pd.notna(start):
+                cursor.execute(f"DELETE FROM {table_name} WHERE {bucket} >= ?;", (int(start),))
+            load_df_to_table(cursor, df, table_name, strategy, batch_size)
+
+
+def verify_aggregates(cursor: Cursor, names):
+    fact_totals = dict(zip(['items', 'orders', 'revenue_cents', 'freight_cents'], cursor.execute(
+        "SELECT COUNT(*), COUNT(DISTINCT order_id), "
+        "CAST(ROUND(SUM(price) * 100, 0) AS BIGINT), CAST(ROUND(SUM(freight_value) * 100, 0) AS BIGINT) "
+        "FROM FACT_ORDER_ITEMS;"
+    ).fetchone()))
+    mismatches = []
+    for table_name in names:
+        measures = TOTALS[AGGREGATES[table_name]['grain']]
+        totals = cursor.execute(
+            f"SELECT {', '.join(f'SUM({measure})' for measure in measures)} FROM {table_name};"
+        ).fetchone()
+        mismatches += [
+            f"{table_name}.{measure} adds up to {total}, FACT_ORDER_ITEMS to {fact_totals[measure]}"
+            for measure, total in zip(measures, totals) if (total or 0) != (fact_totals[measure] or 0)
+        ]
+    if mismatches:
+        raise ValueError("; ".join(mismatches))
+    print(f"Verified {len(names)} aggregate tables against FACT_ORDER_ITEMS")
+
@@ -0,0 +1,95 @@
+import cProfile
+import json
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from threading import Lock
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+reports_path = Path(__file__).parent.parent / "reports"
+_current = ContextVar("etl_stage", default=None)
+
+
+def peak_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def count_rows(value) -> int | None:
+    return len(value) if isinstance(value, pd.DataFrame) else None
+
+
+class RunReport:
+    def __init__(self):
+        self.started_at = pd.Timestamp.now(tz="UTC")
+        self.stages = []
+        self._lock = Lock()
+
+    def add(self, stage: dict):
+        with self._lock:
+            self.stages.append(stage)
+
+    def as_dict(self) -> dict:
+        return {
+            'started_at': self.started_at.isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': self.stages,
+        }
+
+    def write(self, path: Path = None) -> Path:
+        if path is None:
+            path = reports_path / f"run-{self.started_at:%Y%m%dT%H%M%S}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict(), indent=2, default=str))
+        print(f"Run report written to {path}")
+        return path
+
+
+report = RunReport()
+
+
+@contextmanager
+def measure(name: str, kind: str, rows_in: int = None, profile_path: Path = None):
+    stage = {'stage': name, 'kind': kind, 'rows_in': rows_in, 'rows_out': None}
+    token = _current.set(stage)
+    profiler = cProfile.Profile() if profile_path else None
+    rss_before = peak_rss_bytes()
+    wall_started = time.perf_counter()
+    cpu_started = time.thread_time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield stage
+    finally:
+        if profiler:
+            profiler.disable()
+            profile_path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(profile_path)
+            stage['profile'] = str(profile_path)
+        stage['wall_seconds'] = round(time.perf_counter() - wall_started, 4)
+        # Only the stage's own thread: DuckDB's threads and shard worker processes are not counted
+        stage['thread_cpu_seconds'] = round(time.thread_time() - cpu_started, 4)
+        # How far the whole process's high-water mark rose meanwhile, concurrent stages included
+        rss_after = peak_rss_bytes()
+        stage['process_peak_rss_growth_bytes'] = None if rss_before is None else rss_after - rss_before
+        _current.reset(token)
+        report.add(stage)
+
+
+def record(**values):
+    stage = _current.get()
+    if stage is not None:
+        stage.update(values)
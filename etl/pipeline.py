@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from etl.cache import refreshing
+from etl.metrics import count_rows, measure, reports_path
+
+
+class Stage:
+    def __init__(self, name: str, func, inputs=(), **kwargs):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.kwargs = kwargs
+
+    @property
+    def kind(self) -> str:
+        prefix = self.name.split('_', 1)[0]
+        return prefix if prefix in ('extract', 'transform', 'load') else 'stage'
+
+    def run(self, results: dict, force: bool = False, profile: bool = False):
+        args = [results[name] for name in self.inputs]
+        rows_in = sum(count_rows(arg) or 0 for arg in args) if args else None
+        profile_path = reports_path / f"{self.name}.prof" if profile else None
+        with measure(self.name, self.kind, rows_in, profile_path) as stage, refreshing(force):
+            result = self.func(*args, **self.kwargs)
+            stage['rows_out'] = count_rows(result)
+        return result
+
+
+def select_stages(stages: list[Stage], targets=None) -> list[Stage]:
+    by_name = {stage.name: stage for stage in stages}
+    if not targets:
+        return list(stages)
+
+    unknown = set(targets) - set(by_name)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].inputs)
+    return [stage for stage in stages if stage.name in selected]
+
+
+def run_pipeline(
+    stages: list[Stage],
+    targets=None,
+    force=(),
+    max_workers: int = 4,
+    profile=(),
+) -> dict:
+    stages = select_stages(stages, targets)
+    force = {stage.name for stage in stages} if force is True else set(force)
+    results = {}
+    waiting = {stage.name: stage for stage in stages}
+    running = {}
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while waiting or running:
+            ready = [
+                stage for stage in waiting.values()
+                if all(name in results for name in stage.inputs)
+            ]
+            for stage in ready:
+                del waiting[stage.name]
+                future = executor.submit(stage.run, results, stage.name in force, stage.name in profile)
+                running[future] = (stage, time.perf_counter())
+
+            if not running:
+                raise ValueError(f"Stages with unresolved inputs: {', '.join(sorted(waiting))}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, stage_started = running.pop(future)
+                results[stage.name] = future.result()
+                print(f"{stage.name} finished in {time.perf_counter() - stage_started:.2f}s")
+
+    print(f"Pipeline finished in {time.perf_counter() - started:.2f}s")
+    return results
@@ -0,0 +1,121 @@
+import importlib.util
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pandas as pd
+
+ID = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else 'object'
+DATE_FORMAT = 'ISO8601'
+# Money is kept as integer cents from extraction until the loader encodes it as DECIMAL(12,2)
+MONEY_COLUMNS = {'price', 'freight_value'}
+
+SCHEMAS = {
+    'orders': {
+        'dtype': {
+            'order_id': ID,
+            'customer_id': ID,
+            'order_status': 'category',
+        },
+        'parse_dates': [
+            'order_purchase_timestamp',
+            'order_approved_at',
+            'order_delivered_carrier_date',
+            'order_delivered_customer_date',
+            'order_estimated_delivery_date',
+        ],
+    },
+    'customers': {
+        'dtype': {
+            'customer_id': ID,
+            'customer_unique_id': ID,
+            'customer_zip_code_prefix': 'Int32',
+            'customer_city': 'category',
+            'customer_state': 'category',
+        },
+    },
+    'order_items': {
+        'dtype': {
+            'order_id': ID,
+            'order_item_id': 'Int16',
+            'product_id': ID,
+            'seller_id': ID,
+            'price': 'float64',
+            'freight_value': 'float64',
+        },
+        'parse_dates': ['shipping_limit_date'],
+        'money': ['price', 'freight_value'],
+    },
+    'order_reviews': {
+        'dtype': {
+            'review_id': ID,
+            'order_id': ID,
+            'review_score': 'Int8',
+        },
+        'parse_dates': ['review_creation_date', 'review_answer_timestamp'],
+    },
+    'sellers': {
+        'dtype': {
+            'seller_id': ID,
+            'seller_zip_code_prefix': 'Int32',
+            'seller_city': 'category',
+            'seller_state': 'category',
+        },
+    },
+    'products': {
+        'dtype': {
+            'product_id': ID,
+            'product_category_name': 'category',
+            'product_name_lenght': 'Int32',
+            'product_description_lenght': 'Int32',
+            'product_photos_qty': 'Int16',
+            'product_weight_g': 'Int32',
+            'product_length_cm': 'Int32',
+            'product_height_cm': 'Int32',
+            'product_width_cm': 'Int32',
+        },
+    },
+    'product_category_name_translation': {
+        'dtype': {
+            'product_category_name': 'category',
+            'product_category_name_english': 'category',
+        },
+    },
+    'brazil_cities': {
+        'dtype': {
+            'STATE': 'category',
+        },
+    },
+}
+
+
+def read_options(name: str, columns: list[str] = None) -> dict:
+    schema = SCHEMAS.get(name, {})
+    options = {'dtype': schema.get('dtype')}
+    parse_dates = [col for col in schema.get('parse_dates', []) if columns is None or col in columns]
+    if parse_dates:
+        options['parse_dates'] = parse_dates
+        options['date_format'] = DATE_FORMAT
+    return options
+
+
+def to_cents(values: pd.Series) -> pd.Series:
+    amounts = values.to_numpy(dtype='float64', na_value=np.nan)
+    cents = np.round(amounts * 100)
+    # Amounts with more than two decimals are rounded the way DECIMAL(12,2) rounds them
+    inexact = np.flatnonzero(~np.isnan(amounts) & (cents / 100 != amounts))
+    for i in inexact:
+        cents[i] = int(Decimal(str(amounts[i])).quantize(Decimal('0.01'), ROUND_HALF_UP) * 100)
+    return pd.Series(cents, index=values.index).astype('Int64')
+
+
+def cents_to_decimal(cents) -> Decimal | None:
+    if cents is None:
+        return None
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def apply_schema(name: str, df: pd.DataFrame) -> pd.DataFrame:
+    for col in SCHEMAS.get(name, {}).get('money', []):
+        if col in df.columns:
+            df[col] = to_cents(df[col])
+    return df
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from etl.cache import cached
+from etl.metrics import record
+from etl.transform import order_items_lookups, transform_order_items_chunk, transform_orders
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Lookups every shard needs, set once per worker process by the pool initializer
+_broadcast = {}
+
+
+def shard_of(order_ids: pd.Series, shards: int) -> np.ndarray:
+    return (pd.util.hash_pandas_object(order_ids, index=False).to_numpy() % shards).astype('int64')
+
+
+def partition(df: pd.DataFrame, shards: int) -> list[tuple[np.ndarray, pd.DataFrame]]:
+    ids = shard_of(df['order_id'], shards)
+    partitions = []
+    for shard in range(shards):
+        positions = np.flatnonzero(ids == shard)
+        partitions.append((positions, df.iloc[positions]))
+    return partitions
+
+
+def _init_worker(broadcast: dict):
+    _broadcast.update(broadcast)
+
+
+def _transform_orders_shard(shard: int, raw_orders: pd.DataFrame) -> tuple[int, pd.DataFrame, float]:
+    started = time.perf_counter()
+    transformed = transform_orders.__wrapped__(
+        raw_orders, _broadcast['raw_customers'], _broadcast['transformed_cities']
+    )
+    return shard, transformed, time.perf_counter() - started
+
+
+def _transform_order_items_shard(
+    shard: int, raw_order_items: pd.DataFrame, orders: pd.DataFrame, reviews: pd.DataFrame
+) -> tuple[int, pd.DataFrame, float]:
+    started = time.perf_counter()
+    lookups = {'sellers_cities': _broadcast['sellers_cities'], 'orders': orders, 'reviews': reviews}
+    transformed = transform_order_items_chunk(raw_order_items, lookups)
+    return shard, transformed, time.perf_counter() - started
+
+
+def run_shards(func, tasks: list[tuple], broadcast: dict, workers: int) -> dict:
+    # spawn rather than fork, the pipeline calls this from a thread of its own pool
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)), mp_context=context, initializer=_init_worker, initargs=(broadcast,)
+    ) as executor:
+        futures = [executor.submit(func, shard, *args) for shard, *args in tasks]
+        results = {}
+        for future in futures:
+            shard, transformed, seconds = future.result()
+            results[shard] = (transformed, seconds)
+    return results
+
+
+def combine(results: dict, positions: dict) -> pd.DataFrame:
+    # Shards come back in input order, so restoring the input positions reproduces the serial output
+    frames = []
+    for shard in sorted(results):
+        transformed, _ = results[shard]
+        if len(transformed) != len(positions[shard]):
+            raise ValueError(
+                f"Shard {shard} returned {len(transformed)} rows for {len(positions[shard])} input rows"
+            )
+        frames.append(transformed.set_axis(positions[shard]))
+    combined = pd.concat(frames).sort_index()
+
+    timings = [
+        {'shard': shard, 'rows': len(results[shard][0]), 'seconds': round(results[shard][1], 4)}
+        for shard in sorted(results)
+    ]
+    record(shards=timings)
+    slowest = max(timings, key=lambda timing: timing['seconds'])
+    print(f"Transformed {len(timings)} shards, slowest shard {slowest['shard']} took {slowest['seconds']:.2f}s")
+    return combined
+
+
+@cached("transformed_orders")
+def transform_orders_sharded(
+    raw_orders: pd.DataFrame,
+    raw_customers: pd.DataFrame,
+    transformed_cities: pd.DataFrame,
+    shards: int = DEFAULT_WORKERS,
+    workers: int = DEFAULT_WORKERS,
+) -> pd.DataFrame:
+    if shards <= 1 or len(raw_orders) == 0:
+        return transform_orders.__wrapped__(raw_orders, raw_customers, transformed_cities)
+
+    raw_orders = raw_orders.reset_index(drop=True)
+    tasks, positions = [], {}
+    for shard, (shard_positions, shard_orders) in enumerate(partition(raw_orders, shards)):
+        if len(shard_orders) == 0:
+            continue
+        # transform_orders keeps the first row of each order_id, and an order_id never spans shards
+        positions[shard] = shard_positions[~shard_orders['order_id'].duplicated().to_numpy()]
+        tasks.append((shard, shard_orders))
+
+    broadcast = {'raw_customers': raw_customers, 'transformed_cities': transformed_cities}
+    return combine(run_shards(_transform_orders_shard, tasks, broadcast, workers), positions)
+
+
+@cached("transformed_order_items")
+def transform_order_items_sharded(
+    raw_order_items: pd.DataFrame,
+    extracted_sellers: pd.DataFrame,
+    transformed_cities: pd.DataFrame,
+    transformed_orders: pd.DataFrame,
+    transform_reviews: pd.DataFrame,
+    shards: int = DEFAULT_WORKERS,
+    workers: int = DEFAULT_WORKERS,
+) -> pd.DataFrame:
+    lookups = order_items_lookups(extracted_sellers, transformed_cities, transformed_orders, transform_reviews)
+    if shards <= 1 or len(raw_order_items) == 0:
+        return transform_order_items_chunk(raw_order_items, lookups)
+
+    # Orders and reviews are keyed by order_id too, so they are split alongside the items
+    orders = partition(lookups['orders'], shards)
+    reviews = partition(lookups['reviews'], shards)
+
+    tasks, positions = [], {}
+    for shard, (shard_positions, shard_items) in enumerate(partition(raw_order_items, shards)):
+        if len(shard_items) == 0:
+            continue
+        # Repeated (order_id, order_item_id) rows are dropped in the shard, an order_id never spans shards
+        positions[shard] = shard_positions[~shard_items.duplicated(subset=['order_id', 'order_item_id']).to_numpy()]
+        tasks.append((shard, shard_items, orders[shard][1], reviews[shard][1]))
+
+    broadcast = {'sellers_cities': lookups['sellers_cities']}
+    return combine(run_shards(_transform_order_items_shard, tasks, broadcast, workers), positions)
@@ -0,0 +1,98 @@
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+# Dimension -> (natural key, integer surrogate key)
+SURROGATE_KEYS = {
+    'DIM_PRODUCTS': ('product_id', 'product_key'),
+    'DIM_CITIES': ('city_id', 'city_key'),
+    'DIM_REVIEWS': ('review_id', 'review_key'),
+}
+
+# Fact natural foreign key -> (dimension, integer foreign key)
+FOREIGN_KEYS = {
+    'product_id': ('DIM_PRODUCTS', 'product_key'),
+    'review_id': ('DIM_REVIEWS', 'review_key'),
+    'seller_city_id': ('DIM_CITIES', 'seller_city_key'),
+    'customer_city_id': ('DIM_CITIES', 'customer_city_key'),
+}
+
+TIMESTAMP_COLUMNS = [
+    'shipping_limit_timestamp',
+    'order_purchase_timestamp',
+    'order_approved_timestamp',
+    'order_delivered_carrier_timestamp',
+    'order_delivered_customer_timestamp',
+    'order_estimated_delivery_timestamp',
+]
+
+KEY_DTYPE = 'Int32'
+
+
+def hour_keys(values: pd.Series) -> pd.Series:
+    # YYYYMMDDHH fits in a signed 32-bit INT until the year 2147
+    return pd.to_numeric(values).astype(KEY_DTYPE)
+
+
+def assign_surrogate_keys(dim: pd.DataFrame, natural_key: str, key_column: str) -> pd.DataFrame:
+    codes, _ = pd.factorize(dim[natural_key], sort=True)
+    keyed = dim.copy()
+    keyed.insert(0, key_column, pd.array(codes + 1, dtype=KEY_DTYPE))
+    return keyed
+
+
+def key_mapping(dim: pd.DataFrame, natural_key: str, key_column: str) -> tuple[pd.Index, np.ndarray]:
+    return pd.Index(dim[natural_key]), dim[key_column].to_numpy(dtype='int64')
+
+
+def map_keys(values: pd.Series, mapping: tuple[pd.Index, np.ndarray]) -> pd.Series:
+    index, keys = mapping
+    positions = index.get_indexer(values)
+    mapped = pd.array(keys[positions], dtype=KEY_DTYPE)
+    mapped[positions == -1] = pd.NA
+    return pd.Series(mapped, index=values.index, name=values.name)
+
+
+def surrogate_fact(order_items: pd.DataFrame, mappings: dict) -> pd.DataFrame:
+    fact = order_items.copy()
+    for natural_key, (dim_name, key_column) in FOREIGN_KEYS.items():
+        position = fact.columns.get_loc(natural_key)
+        keys = map_keys(fact.pop(natural_key), mappings[dim_name])
+        fact.insert(position, key_column, keys)
+    for column in TIMESTAMP_COLUMNS:
+        fact[column] = hour_keys(fact[column])
+    return fact
+
+
+def surrogate_facts(chunks: Iterable[pd.DataFrame], mappings: dict) -> Iterator[pd.DataFrame]:
+    for chunk in chunks:
+        yield surrogate_fact(chunk, mappings)
+
+
+def surrogate_tables(
+    products: pd.DataFrame,
+    cities: pd.DataFrame,
+    timestamps: pd.DataFrame,
+    reviews: pd.DataFrame,
+    order_items: pd.DataFrame | Iterable[pd.DataFrame],
+) -> dict:
+    dims = {
+        'DIM_PRODUCTS': products,
+        'DIM_CITIES': cities,
+        'DIM_REVIEWS': reviews,
+    }
+    tables, mappings = {}, {}
+    for dim_name, (natural_key, key_column) in SURROGATE_KEYS.items():
+        tables[dim_name] = assign_surrogate_keys(dims[dim_name], natural_key, key_column)
+        mappings[dim_name] = key_mapping(tables[dim_name], natural_key, key_column)
+
+    tables['DIM_TIMESTAMP'] = timestamps.assign(timestamp=hour_keys(timestamps['timestamp']))
+    if isinstance(order_items, pd.DataFrame):
+        tables['FACT_ORDER_ITEMS'] = surrogate_fact(order_items, mappings)
+    else:
+        tables['FACT_ORDER_ITEMS'] = surrogate_facts(order_items, mappings)
+    return {
+        name: tables[name]
+        for name in ['DIM_PRODUCTS', 'DIM_CITIES', 'DIM_TIMESTAMP', 'DIM_REVIEWS', 'FACT_ORDER_ITEMS']
+    }
@@ -1,25 +1,35 @@
-from decimal import Decimal
-from pathlib import Path
+from functools import lru_cache
+from typing import Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 import uuid
-from unidecode import unidecode
 
-cache_path = Path(__file__).parent.parent / "cache"
+from etl.cache import cached
+from etl.cities import city_index
+from etl.joins import first_per_key, join
+from etl.schema import ID
 
 
-def sanitize_string(s):
-    if pd.isna(s):
-        return None
-    return unidecode(s).lower()
+def to_hour_key_int(values: pd.Series) -> pd.Series:
+    dt = pd.to_datetime(values).dt
+    return (
+        dt.year.astype('Int64') * 1_000_000
+        + dt.month.astype('Int64') * 10_000
+        + dt.day.astype('Int64') * 100
+        + dt.hour.astype('Int64')
+    )
 
 
-def to_datetime_str(dt):
-    if pd.isna(dt):
-        return None
-    return pd.to_datetime(dt).strftime('%Y%m%d%H')
+def to_hour_key(values: pd.Series) -> pd.Series:
+    keys = to_hour_key_int(values)
+    mask = keys.notna().to_numpy()
+    out = np.full(len(keys), None, dtype=object)
+    out[mask] = keys.to_numpy(dtype='int64', na_value=0)[mask].astype(str)
+    return pd.Series(out, index=values.index, dtype=ID)
 
 
+@cached("transformed_products")
 def transform_products(
     products: pd.DataFrame,
     products_category_name_translation: pd.DataFrame
@@ -38,23 +48,49 @@ def transform_products(
     merged['product_width_cm'] = merged['product_width_cm'].fillna(0).astype('Int64')
 
     merged = merged.drop(['product_name_lenght', 'product_description_lenght'], axis=1)
-    merged = merged.where(pd.notnull(merged), None)
-    merged = merged.astype(object).where(pd.notnull(merged), None)
     return merged
 
 
+def _uuid5_hex(name: str) -> str:
+    return uuid.uuid5(uuid.NAMESPACE_DNS, name).hex
+
+
+# City ids repeat on every run and every chunk, order item ids never do, so only cities are memoized
+_city_uuid5_hex = lru_cache(maxsize=16_384)(_uuid5_hex)
+
+
+def generate_ids(left: pd.Series, right: pd.Series, hasher=_uuid5_hex) -> pd.Series:
+    left_codes, left_uniques = pd.factorize(left, use_na_sentinel=False)
+    right_codes, right_uniques = pd.factorize(right, use_na_sentinel=False)
+    pair_codes = left_codes.astype('int64') * len(right_uniques) + right_codes
+    unique_pairs, inverse = np.unique(pair_codes, return_inverse=True)
+
+    left_values = np.asarray(left_uniques, dtype=object)
+    right_values = np.asarray(right_uniques, dtype=object)
+    ids = np.array([
+        hasher(f"{left_values[code // len(right_uniques)]}-{right_values[code % len(right_uniques)]}")
+        for code in unique_pairs
+    ], dtype=object)
+    return pd.Series(ids[inverse.reshape(-1)], index=left.index, dtype=ID)
+
+
 def generate_city_id(state: str, city: str) -> str:
-    namespace = uuid.NAMESPACE_DNS
-    name = f"{state}-{city}"
-    return uuid.uuid5(namespace, name).hex
+    return _city_uuid5_hex(f"{state}-{city}")
 
 
 def generate_order_item_id(order_id: str, position: int) -> str:
-    namespace = uuid.NAMESPACE_DNS
-    name = f"{order_id}-{position}"
-    return uuid.uuid5(namespace, name).hex
+    return _uuid5_hex(f"{order_id}-{position}")
+
+
+def generate_city_ids(states: pd.Series, cities: pd.Series) -> pd.Series:
+    return generate_ids(states, cities, _city_uuid5_hex)
 
 
+def generate_order_item_ids(order_ids: pd.Series, positions: pd.Series) -> pd.Series:
+    return generate_ids(order_ids, positions)
+
+
+@cached("transformed_cities")
 def transform_cities(cities: pd.DataFrame) -> pd.DataFrame:
     cols_map = {
         'CITY': 'city_name',
@@ -79,10 +115,7 @@ def transform_cities(cities: pd.DataFrame) -> pd.DataFrame:
     for col in int_cols:
         df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
 
-    df['city_id'] = df.apply(
-        lambda row: generate_city_id(row['state_code'], row['city_name']),
-        axis=1
-    )
+    df['city_id'] = generate_city_ids(df['state_code'], df['city_name'])
     df = df[[
         'city_id',
         'city_name',
@@ -96,8 +129,6 @@ def transform_cities(cities: pd.DataFrame) -> pd.DataFrame:
         'ibge_du_rural',
         'ibge_pop',
     ]]
-    df = df.where(pd.notnull(df), None)
-    df = df.astype(object).where(pd.notnull(df), None)
     return df
 
 
@@ -110,7 +141,7 @@ def generate_timestamps(start_year=2016, end_year=2018) -> pd.DataFrame:
 
     df = pd.DataFrame({'datetime': dt_range})
 
-    df['timestamp'] = df['datetime'].dt.strftime('%Y%m%d%H')
+    df['timestamp'] = to_hour_key(df['datetime'])
     df['year'] = df['datetime'].dt.year
     df['month'] = df['datetime'].dt.month
     df['day'] = df['datetime'].dt.day
@@ -121,6 +152,7 @@ def generate_timestamps(start_year=2016, end_year=2018) -> pd.DataFrame:
     return df
 
 
+@cached("transformed_timestamps")
 def transform_timestamps(raw_order_items: pd.DataFrame, raw_orders: pd.DataFrame) -> pd.DataFrame:
     datetime_cols = [
         'order_purchase_timestamp',
@@ -130,17 +162,14 @@ def transform_timestamps(raw_order_items: pd.DataFrame, raw_orders: pd.DataFrame
         'order_estimated_delivery_date'
     ]
 
-    timestamps = pd.concat([
-        raw_orders[col].dropna().astype(str) for col in datetime_cols
-    ], ignore_index=True)
+    hours = pd.concat([
+        pd.to_datetime(raw_orders[col]).dropna().dt.floor('h') for col in datetime_cols
+    ] + [
+        pd.to_datetime(raw_order_items['shipping_limit_date']).dropna().dt.floor('h')
+    ], ignore_index=True).drop_duplicates()
 
-    shipping_limits = raw_order_items['shipping_limit_date'].dropna().astype(str)
-
-    all_timestamps = pd.concat([timestamps, shipping_limits], ignore_index=True)
-    all_timestamps = pd.to_datetime(all_timestamps)
-
-    df = pd.DataFrame({'datetime': all_timestamps})
-    df['timestamp'] = df['datetime'].dt.strftime('%Y%m%d%H')
+    df = pd.DataFrame({'datetime': hours})
+    df['timestamp'] = to_hour_key(df['datetime'])
     df['year'] = df['datetime'].dt.year
     df['month'] = df['datetime'].dt.month
     df['day'] = df['datetime'].dt.day
@@ -152,58 +181,37 @@ def transform_timestamps(raw_order_items: pd.DataFrame, raw_orders: pd.DataFrame
     return df
 
 
+@cached("transformed_orders")
 def transform_orders(
     raw_orders: pd.DataFrame,
     raw_customers: pd.DataFrame,
     transformed_cities: pd.DataFrame
 ) -> pd.DataFrame:
-    cache_file = cache_path / f"transformed_orders.pkl"
-    if cache_file.exists():
-        return pd.read_pickle(cache_file)
-
-    transformed_cities = transformed_cities.copy()
-
-    orders_customers = raw_orders.merge(
-        raw_customers[['customer_id', 'customer_unique_id', 'customer_city']],
-        on='customer_id',
-        how='left'
+    # A repeated customer_id keeps its first row, as the DuckDB engine does, instead of fanning out the orders
+    customers = first_per_key(
+        raw_customers[['customer_id', 'customer_unique_id', 'customer_city', 'customer_state']], 'customer_id'
     )
-
-    orders_customers['customer_city'] = orders_customers['customer_city'].apply(sanitize_string)
-    transformed_cities['city_name'] = transformed_cities['city_name'].apply(sanitize_string)
-
-    orders_customers_cities = orders_customers.merge(
-        transformed_cities[['city_id', 'city_name']],
-        left_on='customer_city',
-        right_on='city_name',
-        how='left'
-    )
-
-    df = orders_customers_cities
+    df = join(raw_orders, customers, on='customer_id', validate='m:1', label='customers')
+    df['city_id'] = city_index(transformed_cities).resolve(df['customer_city'], label='customer cities')
 
     transformed = pd.DataFrame({
         'order_id': df['order_id'],
         'customer_unique_id': df['customer_unique_id'],
         'customer_city_id': df['city_id'],
+        'customer_state': df['customer_state'],
         'order_status': df['order_status'],
-        'order_purchase_timestamp': df['order_purchase_timestamp'].apply(to_datetime_str),
-        'order_approved_timestamp': df['order_approved_at'].apply(to_datetime_str),
-        'order_delivered_carrier_timestamp': df['order_delivered_carrier_date'].apply(to_datetime_str),
-        'order_delivered_customer_timestamp': df['order_delivered_customer_date'].apply(to_datetime_str),
-        'order_estimated_delivery_timestamp': df['order_estimated_delivery_date'].apply(to_datetime_str),
+        'order_purchase_timestamp': to_hour_key(df['order_purchase_timestamp']),
+        'order_approved_timestamp': to_hour_key(df['order_approved_at']),
+        'order_delivered_carrier_timestamp': to_hour_key(df['order_delivered_carrier_date']),
+        'order_delivered_customer_timestamp': to_hour_key(df['order_delivered_customer_date']),
+        'order_estimated_delivery_timestamp': to_hour_key(df['order_estimated_delivery_date']),
     })
     transformed = transformed.drop_duplicates(subset=['order_id'])
-    transformed = transformed.where(pd.notnull(transformed), None)
-    transformed = transformed.astype(object).where(pd.notnull(transformed), None)
-    transformed.to_pickle(cache_file)
     return transformed
 
 
+@cached("transformed_reviews")
 def transform_reviews(raw_reviews: pd.DataFrame) -> pd.DataFrame:
-    cache_file = cache_path / f"transformed_reviews.pkl"
-    if cache_file.exists():
-        return pd.read_pickle(cache_file)
-
     transformed = pd.DataFrame({
         'review_id': raw_reviews['review_id'],
         'order_id': raw_reviews['order_id'],
@@ -212,47 +220,36 @@ def transform_reviews(raw_reviews: pd.DataFrame) -> pd.DataFrame:
         'review_comment_message_length': raw_reviews['review_comment_message'].str.len().fillna(0).astype(int),
     })
     transformed = transformed.drop_duplicates(subset=['review_id'])
-    transformed = transformed.where(pd.notnull(transformed), None)
-    transformed = transformed.astype(object).where(pd.notnull(transformed), None)
-    transformed.to_pickle(cache_file)
     return transformed
 
 
-def transform_order_items(
-    raw_order_items: pd.DataFrame,
+def order_items_lookups(
     extracted_sellers: pd.DataFrame,
     transformed_cities: pd.DataFrame,
     transformed_orders: pd.DataFrame,
     transform_reviews: pd.DataFrame
-) -> pd.DataFrame:
-    cache_file = cache_path / f"transformed_order_items.pkl"
-    if cache_file.exists():
-        return pd.read_pickle(cache_file)
+) -> dict:
+    # seller_city is matched as-is against the normalized names, as it always has been
+    sellers_cities = pd.DataFrame({
+        'seller_id': extracted_sellers['seller_id'],
+        'city_id': city_index(transformed_cities).resolve(
+            extracted_sellers['seller_city'], normalize=False, label='seller cities'
+        ),
+    })
+    # An order keeps its first review, which is the row the fan-out used to collapse onto
+    return {
+        'sellers_cities': sellers_cities,
+        'orders': transformed_orders,
+        'reviews': first_per_key(transform_reviews[['review_id', 'order_id']], 'order_id'),
+    }
 
-    cities = transformed_cities[['city_id', 'city_name']].copy()
-    cities['city_name'] = cities['city_name'].apply(sanitize_string)
 
-    sellers_cities = extracted_sellers.merge(
-        cities,
-        left_on='seller_city',
-        right_on='city_name',
-        how='left'
-    )
-    order_items_full = raw_order_items.merge(
-        sellers_cities[['seller_id', 'city_id']],
-        on='seller_id',
-        how='left'
-    )
-    order_items_all = order_items_full.merge(
-        transformed_orders,
-        on='order_id',
-        how='left'
-    )
-    order_items_all = order_items_all.merge(
-        transform_reviews[['review_id', 'order_id']],
-        on='order_id',
-        how='left'
-    )
+def transform_order_items_chunk(raw_order_items: pd.DataFrame, lookups: dict) -> pd.DataFrame:
+    # A repeated (order_id, order_item_id) source row would repeat the generated primary key
+    raw_order_items = first_per_key(raw_order_items, ['order_id', 'order_item_id'])
+    order_items_full = join(raw_order_items, lookups['sellers_cities'], on='seller_id', label='sellers')
+    order_items_all = join(order_items_full, lookups['orders'], on='order_id', label='orders')
+    order_items_all = join(order_items_all, lookups['reviews'], on='order_id', label='reviews')
     transformed = pd.DataFrame({
         'order_item_position': order_items_all['order_item_id'].astype('Int64'),
         'order_id': order_items_all['order_id'],
@@ -260,9 +257,9 @@ def transform_order_items(
         'seller_id': order_items_all['seller_id'],
         'review_id': order_items_all['review_id'],
         'seller_city_id': order_items_all['city_id'],
-        'shipping_limit_timestamp': order_items_all['shipping_limit_date'].apply(to_datetime_str),
-        'price': order_items_all['price'].apply(lambda x: Decimal(str(x)) if pd.notnull(x) else None),
-        'freight_value': order_items_all['freight_value'].apply(lambda x: Decimal(str(x)) if pd.notnull(x) else None),
+        'shipping_limit_timestamp': to_hour_key(order_items_all['shipping_limit_date']),
+        'price': order_items_all['price'],
+        'freight_value': order_items_all['freight_value'],
         'customer_unique_id': order_items_all['customer_unique_id'],
         'customer_city_id': order_items_all['customer_city_id'],
         'order_status': order_items_all['order_status'],
@@ -272,13 +269,31 @@ def transform_order_items(
         'order_delivered_customer_timestamp': order_items_all['order_delivered_customer_timestamp'],
         'order_estimated_delivery_timestamp': order_items_all['order_estimated_delivery_timestamp'],
     })
-    transformed['order_item_id'] = transformed.apply(
-        lambda row: generate_order_item_id(row['order_id'], row['order_item_position']),
-        axis=1
+    transformed['order_item_id'] = generate_order_item_ids(
+        transformed['order_id'], transformed['order_item_position']
     )
-    transformed = transformed.drop_duplicates(subset=['order_item_id'])
-    transformed = transformed.where(pd.notnull(transformed), None)
-    transformed = transformed.astype(object).where(pd.notnull(transformed), None)
-    transformed.to_pickle(cache_file)
     return transformed
 
+
+@cached("transformed_order_items")
+def transform_order_items(
+    raw_order_items: pd.DataFrame,
+    extracted_sellers: pd.DataFrame,
+    transformed_cities: pd.DataFrame,
+    transformed_orders: pd.DataFrame,
+    transform_reviews: pd.DataFrame
+) -> pd.DataFrame:
+    lookups = order_items_lookups(extracted_sellers, transformed_cities, transformed_orders, transform_reviews)
+    return transform_order_items_chunk(raw_order_items, lookups)
+
+
+def transform_order_items_chunks(
+    raw_order_items_chunks: Iterable[pd.DataFrame],
+    extracted_sellers: pd.DataFrame,
+    transformed_cities: pd.DataFrame,
+    transformed_orders: pd.DataFrame,
+    transform_reviews: pd.DataFrame
+) -> Iterator[pd.DataFrame]:
+    lookups = order_items_lookups(extracted_sellers, transformed_cities, transformed_orders, transform_reviews)
+    for chunk in raw_order_items_chunks:
+        yield transform_order_items_chunk(chunk, lookups)
@@ -0,0 +1,251 @@
+from typing import Iterable, Iterator
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from etl.cache import cached
+from etl.cities import city_index
+from etl.schema import ID
+from etl.transform import generate_order_item_ids, transform_cities  # noqa: F401 - cities stay on pandas
+
+
+def query(sql: str, dtypes: dict, **frames) -> pd.DataFrame:
+    with duckdb.connect() as conn:
+        for name, df in frames.items():
+            conn.register(name, df)
+        result = conn.execute(sql).df()
+    return result.astype(dtypes)
+
+
+def with_position(df: pd.DataFrame) -> pd.DataFrame:
+    # SQL joins do not keep row order, _pos restores the order pandas merges produce
+    return df.assign(_pos=np.arange(len(df)))
+
+
+def hour_key(column: str) -> str:
+    return f"strftime({column}, '%Y%m%d%H')"
+
+
+@cached("transformed_products")
+def transform_products(
+    products: pd.DataFrame,
+    products_category_name_translation: pd.DataFrame
+):
+    return query("""
+        SELECT
+            p.product_id,
+            p.product_category_name,
+            coalesce(p.product_photos_qty, 0) AS product_photos_qty,
+            coalesce(p.product_weight_g, 0) AS product_weight_g,
+            coalesce(p.product_length_cm, 0) AS product_length_cm,
+            coalesce(p.product_height_cm, 0) AS product_height_cm,
+            coalesce(p.product_width_cm, 0) AS product_width_cm,
+            t.product_category_name_english,
+            coalesce(p.product_name_lenght, 0) AS product_name_length,
+            coalesce(p.product_description_lenght, 0) AS product_description_length
+        FROM products p
+        LEFT JOIN translation t ON p.product_category_name::VARCHAR = t.product_category_name::VARCHAR
+        ORDER BY p._pos, t._pos
+    """, {
+        'product_id': ID,
+        'product_category_name': products['product_category_name'].dtype,
+        'product_photos_qty': 'Int64',
+        'product_weight_g': 'Int64',
+        'product_length_cm': 'Int64',
+        'product_height_cm': 'Int64',
+        'product_width_cm': 'Int64',
+        'product_category_name_english': products_category_name_translation['product_category_name_english'].dtype,
+        'product_name_length': 'Int64',
+        'product_description_length': 'Int64',
+    }, products=with_position(products), translation=with_position(products_category_name_translation))
+
+
+@cached("transformed_timestamps")
+def transform_timestamps(raw_order_items: pd.DataFrame, raw_orders: pd.DataFrame) -> pd.DataFrame:
+    return query(f"""
+        WITH hours AS (
+            SELECT DISTINCT date_trunc('hour', ts) AS ts FROM (
+                SELECT order_purchase_timestamp AS ts FROM orders
+                UNION ALL SELECT order_approved_at FROM orders
+                UNION ALL SELECT order_delivered_carrier_date FROM orders
+                UNION ALL SELECT order_delivered_customer_date FROM orders
+                UNION ALL SELECT order_estimated_delivery_date FROM orders
+                UNION ALL SELECT shipping_limit_date FROM order_items
+            ) WHERE ts IS NOT NULL
+        )
+        SELECT
+            {hour_key('ts')} AS timestamp,
+            year(ts) AS year,
+            month(ts) AS month,
+            day(ts) AS day,
+            hour(ts) AS hour
+        FROM hours
+        ORDER BY timestamp
+    """, {
+        'timestamp': ID, 'year': 'int32', 'month': 'int32', 'day': 'int32', 'hour': 'int32',
+    }, orders=raw_orders, order_items=raw_order_items)
+
+
+@cached("transformed_orders")
+def transform_orders(
+    raw_orders: pd.DataFrame,
+    raw_customers: pd.DataFrame,
+    transformed_cities: pd.DataFrame
+) -> pd.DataFrame:
+    customers = pd.DataFrame({
+        'customer_id': raw_customers['customer_id'],
+        'customer_unique_id': raw_customers['customer_unique_id'],
+        'city_id': city_index(transformed_cities).resolve(raw_customers['customer_city'], label='customer cities'),
+        'customer_state': raw_customers['customer_state'],
+    })
+    return query(f"""
+        SELECT
+            o.order_id,
+            c.customer_unique_id,
+            c.city_id AS customer_city_id,
+            c.customer_state,
+            o.order_status,
+            {hour_key('o.order_purchase_timestamp')} AS order_purchase_timestamp,
+            {hour_key('o.order_approved_at')} AS order_approved_timestamp,
+            {hour_key('o.order_delivered_carrier_date')} AS order_delivered_carrier_timestamp,
+            {hour_key('o.order_delivered_customer_date')} AS order_delivered_customer_timestamp,
+            {hour_key('o.order_estimated_delivery_date')} AS order_estimated_delivery_timestamp
+        FROM orders o
+        LEFT JOIN customers c ON o.customer_id = c.customer_id
+        QUALIFY row_number() OVER (PARTITION BY o.order_id ORDER BY o._pos, c._pos) = 1
+        ORDER BY o._pos, c._pos
+    """, {
+        'order_id': ID,
+        'customer_unique_id': ID,
+        'customer_city_id': ID,
+        'customer_state': raw_customers['customer_state'].dtype,
+        'order_status': raw_orders['order_status'].dtype,
+        'order_purchase_timestamp': ID,
+        'order_approved_timestamp': ID,
+        'order_delivered_carrier_timestamp': ID,
+        'order_delivered_customer_timestamp': ID,
+        'order_estimated_delivery_timestamp': ID,
+    }, orders=with_position(raw_orders), customers=with_position(customers))
+
+
+@cached("transformed_reviews")
+def transform_reviews(raw_reviews: pd.DataFrame) -> pd.DataFrame:
+    return query("""
+        SELECT
+            review_id,
+            order_id,
+            review_score,
+            coalesce(length(review_comment_title), 0) AS review_comment_title_length,
+            coalesce(length(review_comment_message), 0) AS review_comment_message_length
+        FROM reviews
+        QUALIFY row_number() OVER (PARTITION BY review_id ORDER BY _pos) = 1
+        ORDER BY _pos
+    """, {
+        'review_id': ID,
+        'order_id': ID,
+        'review_score': raw_reviews['review_score'].dtype,
+        'review_comment_title_length': 'int64',
+        'review_comment_message_length': 'int64',
+    }, reviews=with_position(raw_reviews))
+
+
+def order_items_lookups(
+    extracted_sellers: pd.DataFrame,
+    transformed_cities: pd.DataFrame,
+    transformed_orders: pd.DataFrame,
+    transform_reviews: pd.DataFrame
+) -> dict:
+    sellers_cities = pd.DataFrame({
+        'seller_id': extracted_sellers['seller_id'],
+        'city_id': city_index(transformed_cities).resolve(
+            extracted_sellers['seller_city'], normalize=False, label='seller cities'
+        ),
+    })
+    return {
+        'sellers_cities': sellers_cities,
+        'orders': transformed_orders,
+        'reviews': with_position(transform_reviews[['review_id', 'order_id']]),
+    }
+
+
+def transform_order_items_chunk(raw_order_items: pd.DataFrame, lookups: dict) -> pd.DataFrame:
+    transformed = query(f"""
+        WITH items AS (
+            SELECT * FROM order_items
+            QUALIFY row_number() OVER (PARTITION BY order_id, order_item_id ORDER BY _pos) = 1
+        ),
+        first_reviews AS (
+            SELECT review_id, order_id FROM reviews
+            QUALIFY row_number() OVER (PARTITION BY order_id ORDER BY _pos) = 1
+        )
+        SELECT
+            i.order_item_id AS order_item_position,
+            i.order_id,
+            i.product_id,
+            i.seller_id,
+            r.review_id,
+            s.city_id AS seller_city_id,
+            {hour_key('i.shipping_limit_date')} AS shipping_limit_timestamp,
+            i.price,
+            i.freight_value,
+            o.customer_unique_id,
+            o.customer_city_id,
+            o.order_status,
+            o.order_purchase_timestamp,
+            o.order_approved_timestamp,
+            o.order_delivered_carrier_timestamp,
+            o.order_delivered_customer_timestamp,
+            o.order_estimated_delivery_timestamp
+        FROM items i
+        LEFT JOIN sellers_cities s ON i.seller_id = s.seller_id
+        LEFT JOIN orders o ON i.order_id = o.order_id
+        LEFT JOIN first_reviews r ON i.order_id = r.order_id
+        ORDER BY i._pos
+    """, {
+        'order_item_position': 'Int64',
+        'order_id': ID,
+        'product_id': ID,
+        'seller_id': ID,
+        'review_id': ID,
+        'seller_city_id': ID,
+        'shipping_limit_timestamp': ID,
+        'price': 'Int64',
+        'freight_value': 'Int64',
+        'customer_unique_id': ID,
+        'customer_city_id': ID,
+        'order_status': lookups['orders']['order_status'].dtype,
+        'order_purchase_timestamp': ID,
+        'order_approved_timestamp': ID,
+        'order_delivered_carrier_timestamp': ID,
+        'order_delivered_customer_timestamp': ID,
+        'order_estimated_delivery_timestamp': ID,
+    }, order_items=with_position(raw_order_items), **lookups)
+    transformed['order_item_id'] = generate_order_item_ids(
+        transformed['order_id'], transformed['order_item_position']
+    )
+    return transformed
+
+
+@cached("transformed_order_items")
+def transform_order_items(
+    raw_order_items: pd.DataFrame,
+    extracted_sellers: pd.DataFrame,
+    transformed_cities: pd.DataFrame,
+    transformed_orders: pd.DataFrame,
+    transform_reviews: pd.DataFrame
+) -> pd.DataFrame:
+    lookups = order_items_lookups(extracted_sellers, transformed_cities, transformed_orders, transform_reviews)
+    return transform_order_items_chunk(raw_order_items, lookups)
+
+
+def transform_order_items_chunks(
+    raw_order_items_chunks: Iterable[pd.DataFrame],
+    extracted_sellers: pd.DataFrame,
+    transformed_cities: pd.DataFrame,
+    transformed_orders: pd.DataFrame,
+    transform_reviews: pd.DataFrame
+) -> Iterator[pd.DataFrame]:
+    lookups = order_items_lookups(extracted_sellers, transformed_cities, transformed_orders, transform_reviews)
+    for chunk in raw_order_items_chunks:
+        yield transform_order_items_chunk(chunk, lookups)
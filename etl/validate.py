@@ -0,0 +1,165 @@
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from etl.metrics import record, reports_path
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+# Constraint -> (fact column, dimension, dimension key), as declared in sql/create_tables.py
+FOREIGN_KEYS = {
+    'FK_ORDERS_City': ('customer_city_id', 'DIM_CITIES', 'city_id'),
+    'FK_FACT_ORDERITEMS_Products': ('product_id', 'DIM_PRODUCTS', 'product_id'),
+    'FK_FACT_ORDERITEMS_Cities': ('seller_city_id', 'DIM_CITIES', 'city_id'),
+    'FK_FACT_ORDERITEMS_Reviews': ('review_id', 'DIM_REVIEWS', 'review_id'),
+    'FK_FACT_ORDERITEMS_Timestamp_Purchase': ('order_purchase_timestamp', 'DIM_TIMESTAMP', 'timestamp'),
+    'FK_FACT_ORDERITEMS_Timestamp_Approved': ('order_approved_timestamp', 'DIM_TIMESTAMP', 'timestamp'),
+    'FK_FACT_ORDERITEMS_Timestamp_Delivered_Carrier': (
+        'order_delivered_carrier_timestamp', 'DIM_TIMESTAMP', 'timestamp'
+    ),
+    'FK_FACT_ORDERITEMS_Timestamp_Delivered_Customer': (
+        'order_delivered_customer_timestamp', 'DIM_TIMESTAMP', 'timestamp'
+    ),
+    'FK_FACT_ORDERITEMS_Timestamp_Estimated_Delivery': (
+        'order_estimated_delivery_timestamp', 'DIM_TIMESTAMP', 'timestamp'
+    ),
+    'FK_FACT_ORDERITEMS_Shipping_Limit': ('shipping_limit_timestamp', 'DIM_TIMESTAMP', 'timestamp'),
+}
+
+SURROGATE_FOREIGN_KEYS = {
+    **FOREIGN_KEYS,
+    'FK_ORDERS_City': ('customer_city_key', 'DIM_CITIES', 'city_key'),
+    'FK_FACT_ORDERITEMS_Products': ('product_key', 'DIM_PRODUCTS', 'product_key'),
+    'FK_FACT_ORDERITEMS_Cities': ('seller_city_key', 'DIM_CITIES', 'city_key'),
+    'FK_FACT_ORDERITEMS_Reviews': ('review_key', 'DIM_REVIEWS', 'review_key'),
+}
+
+# Foreign key columns declared NOT NULL, which the null policy cannot clear
+NOT_NULL_COLUMNS = {'product_id', 'product_key'}
+
+POLICIES = ('fail', 'null', 'quarantine')
+SAMPLE_SIZE = 5
+
+
+class IntegrityError(ValueError):
+    def __init__(self, violations: list[dict]):
+        self.violations = violations
+        summary = ', '.join(f"{v['constraint']} ({v['violations']} rows)" for v in violations)
+        super().__init__(f"Foreign key violations: {summary}")
+
+
+def dimension_keys(tables: dict, foreign_keys: dict) -> dict:
+    keys = {}
+    for _, dim_name, dim_key in foreign_keys.values():
+        if (dim_name, dim_key) not in keys:
+            keys[dim_name, dim_key] = pd.Index(tables[dim_name][dim_key].dropna().unique())
+    return keys
+
+
+def in_keys(values: pd.Series, keys: pd.Index) -> np.ndarray:
+    # Series.isin converts Arrow strings through Python objects, Arrow's own hash lookup does not
+    if pa is not None and pd.api.types.is_string_dtype(values.dtype):
+        return pc.is_in(pa.array(values.array), value_set=pa.array(keys.array)).to_numpy(zero_copy_only=False)
+    return keys.get_indexer(values) >= 0
+
+
+def find_orphans(fact: pd.DataFrame, keys: dict, foreign_keys: dict) -> dict:
+    orphans = {}
+    for constraint, (column, dim_name, dim_key) in foreign_keys.items():
+        values = fact[column]
+        orphans[constraint] = values.notna().to_numpy(dtype=bool) & ~in_keys(values, keys[dim_name, dim_key])
+    return orphans
+
+
+def violation_report(fact: pd.DataFrame, orphans: dict, foreign_keys: dict) -> list[dict]:
+    report = []
+    for constraint, mask in orphans.items():
+        count = int(mask.sum())
+        if count:
+            column, dim_name, dim_key = foreign_keys[constraint]
+            report.append({
+                'constraint': constraint,
+                'column': column,
+                'references': f"{dim_name}({dim_key})",
+                'violations': count,
+                'sample': [str(v) for v in fact.loc[mask, column].unique()[:SAMPLE_SIZE]],
+            })
+    return report
+
+
+def apply_policy(
+    fact: pd.DataFrame, orphans: dict, foreign_keys: dict, policy: str
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    quarantine_mask = np.zeros(len(fact), dtype=bool)
+    fact = fact.copy()
+    for constraint, mask in orphans.items():
+        column = foreign_keys[constraint][0]
+        if policy == 'quarantine' or column in NOT_NULL_COLUMNS:
+            quarantine_mask |= mask
+        else:
+            fact.loc[mask, column] = pd.NA
+
+    quarantined = fact[quarantine_mask].assign(violations=[
+        ', '.join(constraint for constraint, mask in orphans.items() if mask[i])
+        for i in np.flatnonzero(quarantine_mask)
+    ])
+    return fact[~quarantine_mask], quarantined
+
+
+def write_quarantine(quarantined: pd.DataFrame, path=None):
+    if path is None:
+        path = reports_path / f"quarantine-{pd.Timestamp.now(tz='UTC'):%Y%m%dT%H%M%S}.csv"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    quarantined.to_csv(path, mode='a', header=not path.exists(), index=False)
+    print(f"Quarantined {len(quarantined)} fact rows to {path}")
+    return path
+
+
+def validate_fact(fact: pd.DataFrame, keys: dict, foreign_keys: dict, policy: str, quarantine_path=None):
+    orphans = find_orphans(fact, keys, foreign_keys)
+    violations = violation_report(fact, orphans, foreign_keys)
+    record(fk_violations=sum(v['violations'] for v in violations), fk_report=violations)
+    if not violations:
+        return fact, quarantine_path
+
+    for violation in violations:
+        print(
+            f"{violation['constraint']}: {violation['violations']} rows of {violation['column']} "
+            f"missing from {violation['references']}, e.g. {', '.join(violation['sample'])}"
+        )
+    if policy == 'fail':
+        raise IntegrityError(violations)
+
+    fact, quarantined = apply_policy(fact, orphans, foreign_keys, policy)
+    if len(quarantined):
+        quarantine_path = write_quarantine(quarantined, quarantine_path)
+    return fact, quarantine_path
+
+
+def validate_facts(
+    chunks: Iterable[pd.DataFrame], keys: dict, foreign_keys: dict, policy: str
+) -> Iterator[pd.DataFrame]:
+    quarantine_path = None
+    for chunk in chunks:
+        chunk, quarantine_path = validate_fact(chunk, keys, foreign_keys, policy, quarantine_path)
+        yield chunk
+
+
+def validate_tables(tables: dict, policy: str = 'fail', surrogate_keys: bool = False) -> dict:
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown violation policy '{policy}', expected one of: {', '.join(POLICIES)}")
+
+    foreign_keys = SURROGATE_FOREIGN_KEYS if surrogate_keys else FOREIGN_KEYS
+    keys = dimension_keys(tables, foreign_keys)
+    fact = tables['FACT_ORDER_ITEMS']
+    if isinstance(fact, pd.DataFrame):
+        fact, _ = validate_fact(fact, keys, foreign_keys, policy)
+    else:
+        # Streamed chunks are checked as they reach the loader, after the dimensions are in
+        fact = validate_facts(fact, keys, foreign_keys, policy)
+    return {**tables, 'FACT_ORDER_ITEMS': fact}
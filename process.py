@@ -1,88 +1,390 @@
-# from connector import connector
-from etl.extract import extract_csv
-# from etl.load import load_sql, load_df_to_table
-from etl.transform import transform_products, transform_cities, generate_timestamps, transform_orders, \
-    transform_reviews, transform_order_items, transform_timestamps
-from sql.create_tables import CREATE_TABLES_SQL
-from sql.drop_tables import DROP_TABLES_SQL
-
-# Extract
-extracted_products = extract_csv("products.csv", cache=True)
-extracted_product_category_name_translation = extract_csv(
-    "product_category_name_translation.csv", cache=True
-)
-extracted_cities = extract_csv(
-    "brazil_cities.csv", cache=True, delimiter=";"
-)
-extracted_orders = extract_csv("orders.csv", cache=True)
-extracted_customers = extract_csv("customers.csv", cache=True)
-extracted_reviews = extract_csv("order_reviews.csv", cache=True)
-extracted_sellers = extract_csv("sellers.csv", cache=True)
-extracted_order_items = extract_csv("order_items.csv", cache=True)
-
-print("All data extracted successfully")
-
-# Transform
-transformed_products = transform_products(
-    extracted_products,
-    extracted_product_category_name_translation
-)
-print("Products transformed successfully")
-
-transformed_cities = transform_cities(extracted_cities)
-print("Cities transformed successfully")
-
-transformed_orders = transform_orders(
-    extracted_orders,
-    extracted_customers,
-    transformed_cities
-)
-print("Orders transformed successfully")
-
-transformed_timestamps = transform_timestamps(extracted_order_items, extracted_orders)
-print("Timestamps generated successfully")
-
-transformed_reviews = transform_reviews(extracted_reviews)
-print('Reviews transformed  successfully')
-
-transformed_order_items = transform_order_items(
-    extracted_order_items, extracted_sellers, transformed_cities, transformed_orders, transformed_reviews
-)
-print("Order items transformed successfully")
-print("All data transformed successfully")
-
-# Load
-# try:
-#     cursor = connector.get_cursor()
-#     # Drop tables
-#     for drop_sql in DROP_TABLES_SQL:
-#         load_sql(cursor, drop_sql)
-#
-#     # Create tables
-#     for create_sql in CREATE_TABLES_SQL:
-#         load_sql(cursor, create_sql)
-#
-#     cursor.fast_executemany = True
-#
-#     # Load products
-#     load_df_to_table(cursor, transformed_products, 'DIM_PRODUCTS')
-#
-#     # Load cities
-#     load_df_to_table(cursor, transformed_cities, 'DIM_CITIES')
-#
-#     # Load timestamps
-#     load_df_to_table(cursor, transformed_timestamps, 'DIM_TIMESTAMP')
-
-#     # Load reviews
-#     load_df_to_table(cursor, transformed_reviews, 'DIM_REVIEWS')
-
-#     # Load order items
-#     load_df_to_table(cursor, transformed_order_items, 'FACT_ORDER_ITEMS')
-#
-#     connector.conn.commit()
-# except Exception as e:
-#     connector.conn.rollback()
-#     print("Failed to load data")
-#     raise e
-# finally:
-#     connector.close()
+import argparse
+
+from pathlib import Path
+
+import pandas as pd
+
+from etl.aggregates import AGGREGATES, build_aggregates, orders_since_month_start
+from etl.bulk import DEFAULT_COMMIT_ROWS
+from etl.changes import changed_orders, order_fingerprints
+from etl.engines import ENGINES, get_engine
+from etl.extract import extract_csv, extract_csv_chunks
+from etl.metrics import report
+from etl.pipeline import Stage, run_pipeline
+from etl.validate import POLICIES, validate_tables
+
+CITY_COLUMNS = [
+    'CITY', 'STATE', 'CAPITAL', 'IBGE_RES_POP', 'IBGE_RES_POP_BRAS', 'IBGE_RES_POP_ESTR',
+    'IBGE_DU', 'IBGE_DU_URBAN', 'IBGE_DU_RURAL', 'IBGE_POP'
+]
+
+
+def read_watermark():
+    from connector import connector
+    from etl.incremental import read_watermark
+
+    return read_watermark(connector.get_cursor())
+
+
+def read_fingerprints():
+    from connector import connector
+    from etl.incremental import read_fingerprints
+
+    return read_fingerprints(connector.get_cursor())
+
+
+def project(df, columns):
+    return df[columns]
+
+
+def stream_order_items(sellers, cities, orders, reviews, engine='pandas'):
+    return get_engine(engine).transform_order_items_chunks(
+        extract_csv_chunks("order_items.csv"), sellers, cities, orders, reviews
+    )
+
+
+def stream_shipping_limits():
+    # Only the distinct shipping-limit hours are kept, which is all the timestamp dimension needs from the items
+    hours = pd.concat([
+        pd.to_datetime(chunk['shipping_limit_date']).dropna().dt.floor('h').drop_duplicates()
+        for chunk in extract_csv_chunks("order_items.csv", columns=['shipping_limit_date'])
+    ], ignore_index=True)
+    return pd.DataFrame({'shipping_limit_date': hours.drop_duplicates().reset_index(drop=True)})
+
+
+def stream_order_fingerprints(orders, reviews):
+    return order_fingerprints(orders, extract_csv_chunks("order_items.csv"), reviews)
+
+
+def warehouse_tables(products, cities, timestamps, reviews, order_items):
+    return {
+        'DIM_PRODUCTS': products,
+        'DIM_CITIES': cities,
+        'DIM_TIMESTAMP': timestamps,
+        'DIM_REVIEWS': reviews,
+        'FACT_ORDER_ITEMS': order_items,
+    }
+
+
+def load_full(
+    tables, orders, fingerprints, aggregates=None, surrogate_keys=False, deferred_constraints=False, resumable=False,
+    commit_rows=DEFAULT_COMMIT_ROWS,
+):
+    from connector import connector
+    from etl.checkpoint import (
+        clear_checkpoints, load_run_id, load_star_schema_resumable, read_checkpoints, verify_row_counts
+    )
+    from etl.incremental import orders_watermark, write_watermark
+    from etl.aggregates import aggregate_model
+    from etl.load import (
+        build_post_load, load_df_to_table, load_sql, load_star_schema, refresh_aggregates, verify_aggregates
+    )
+    from sql.create_tables import CONTROL_TABLES_SQL, CREATE_TABLES_SQL, CREATE_TABLES_SURROGATE_SQL
+    from sql.dialects import create_heap_sql, drop_tables_sql, get_dialect
+    from sql.drop_tables import DROP_TABLES_SQL
+    from sql.tables import table_model
+
+    dialect, model = get_dialect('mssql'), table_model(surrogate_keys)
+    if deferred_constraints:
+        # Bare heaps take the bulk load, keys and indexes are built once the data is in
+        create_tables_sql = create_heap_sql(dialect, model) + CONTROL_TABLES_SQL
+    elif surrogate_keys:
+        create_tables_sql = CREATE_TABLES_SURROGATE_SQL
+    else:
+        create_tables_sql = CREATE_TABLES_SQL
+    aggregate_tables_sql = []
+    if aggregates:
+        aggregate_tables = aggregate_model(list(aggregates))
+        aggregate_tables_sql = drop_tables_sql(dialect, aggregate_tables) + create_heap_sql(dialect, aggregate_tables)
+
+    run_id, checkpoints = None, {}
+    if resumable:
+        run_id = load_run_id(tables)
+        checkpoints = read_checkpoints(connector.get_cursor(), run_id)
+        if checkpoints:
+            print(f"Resuming load {run_id} from its checkpoints")
+            create_tables_sql = aggregate_tables_sql = []
+
+    try:
+        cursor = connector.get_cursor()
+        for drop_sql in DROP_TABLES_SQL if create_tables_sql else []:
+            load_sql(cursor, drop_sql)
+        for create_sql in create_tables_sql + aggregate_tables_sql:
+            load_sql(cursor, create_sql)
+        connector.conn.commit()
+    except Exception as e:
+        connector.conn.rollback()
+        print("Failed to create tables")
+        raise e
+
+    try:
+        # Dimensions load concurrently on pooled connections, the fact table once they have committed
+        if resumable:
+            load_star_schema_resumable(connector.pool, tables, run_id, checkpoints, commit_rows)
+        else:
+            load_star_schema(connector.pool, tables)
+        cursor = connector.get_cursor()
+        if resumable:
+            verify_row_counts(cursor, tables)
+        if deferred_constraints:
+            build_post_load(cursor, dialect, model)
+        if aggregates:
+            # Replacing the buckets rather than appending keeps a resumed load from doubling them
+            refresh_aggregates(cursor, aggregates)
+            verify_aggregates(cursor, list(aggregates))
+        load_df_to_table(cursor, fingerprints, 'ETL_ORDER_FINGERPRINT')
+        write_watermark(cursor, orders_watermark(orders))
+        if resumable:
+            clear_checkpoints(cursor, run_id)
+        connector.conn.commit()
+    except Exception as e:
+        print("Failed to load data")
+        raise e
+    finally:
+        connector.close()
+
+
+def load_incremental(tables, orders, watermark, fingerprints, loaded_fingerprints, aggregates=None):
+    from connector import connector
+    from etl.changes import changed_fingerprints
+    from etl.db import fast_executemany
+    from etl.incremental import load_incremental, orders_watermark
+    from etl.load import refresh_aggregates, verify_aggregates
+
+    # Changed orders can be older than the watermark, which only ever moves forward
+    watermark = max(filter(None, [orders_watermark(orders), watermark]), default=None)
+    try:
+        cursor = fast_executemany(connector.get_cursor())
+        load_incremental(cursor, tables, watermark, changed_fingerprints(fingerprints, loaded_fingerprints))
+        if aggregates:
+            refresh_aggregates(cursor, aggregates)
+            verify_aggregates(cursor, list(aggregates))
+        connector.conn.commit()
+    except Exception as e:
+        connector.conn.rollback()
+        print("Failed to load data incrementally")
+        raise e
+    finally:
+        connector.close()
+
+
+def build_stages(
+    incremental: bool = False,
+    stream: bool = False,
+    surrogate_keys: bool = False,
+    engine: str = 'pandas',
+    on_violation: str = 'fail',
+    deferred_constraints: bool = False,
+    resumable: bool = False,
+    commit_rows: int = DEFAULT_COMMIT_ROWS,
+    shards: int = 1,
+    shard_workers: int = None,
+    aggregates: list[str] = None,
+) -> list[Stage]:
+    transforms = get_engine(engine)
+    transform_orders, transform_order_items = transforms.transform_orders, transforms.transform_order_items
+    shard_options = {}
+    if shards > 1:
+        from etl.shard import transform_order_items_sharded, transform_orders_sharded
+
+        transform_orders, transform_order_items = transform_orders_sharded, transform_order_items_sharded
+        shard_options = {'shards': shards, 'workers': shard_workers or shards}
+    stages = [
+        Stage('extract_products', extract_csv, file_path="products.csv"),
+        Stage(
+            'extract_product_category_name_translation', extract_csv,
+            file_path="product_category_name_translation.csv"
+        ),
+        Stage('extract_cities', extract_csv, file_path="brazil_cities.csv", delimiter=";", columns=CITY_COLUMNS),
+        Stage('extract_orders', extract_csv, file_path="orders.csv"),
+        Stage(
+            'extract_customers', extract_csv,
+            file_path="customers.csv", columns=['customer_id', 'customer_unique_id', 'customer_city', 'customer_state']
+        ),
+        Stage('extract_reviews', extract_csv, file_path="order_reviews.csv"),
+        Stage('extract_sellers', extract_csv, file_path="sellers.csv", columns=['seller_id', 'seller_city']),
+    ]
+
+    orders, order_items, reviews = 'extract_orders', 'extract_order_items', 'extract_reviews'
+    if stream:
+        # The order items are only ever read in chunks, so they never sit in memory whole
+        stages += [
+            Stage('shipping_limits', stream_shipping_limits),
+            Stage('order_fingerprints', stream_order_fingerprints, ['extract_orders', 'extract_reviews']),
+        ]
+        order_items = 'shipping_limits'
+    else:
+        stages += [
+            Stage('extract_order_items', extract_csv, file_path="order_items.csv"),
+            Stage('order_fingerprints', order_fingerprints, [
+                'extract_orders', 'extract_order_items', 'extract_reviews'
+            ]),
+        ]
+    if incremental:
+        from etl.incremental import for_orders
+
+        stages += [
+            Stage('watermark', read_watermark),
+            Stage('loaded_fingerprints', read_fingerprints),
+        ]
+        change_inputs = ['extract_orders', 'order_fingerprints', 'loaded_fingerprints']
+        if aggregates is not None:
+            # Aggregates are refreshed by whole month, so their runs reload every order of the affected months
+            stages += [
+                Stage('changed_orders', changed_orders, change_inputs),
+                Stage('new_orders', orders_since_month_start, ['extract_orders', 'changed_orders']),
+            ]
+        else:
+            stages.append(Stage('new_orders', changed_orders, change_inputs))
+        stages += [
+            Stage('new_order_items', for_orders, ['extract_order_items', 'new_orders']),
+            Stage('new_reviews', for_orders, ['extract_reviews', 'new_orders']),
+        ]
+        orders, order_items, reviews = 'new_orders', 'new_order_items', 'new_reviews'
+
+    stages += [
+        Stage('transform_products', transforms.transform_products, [
+            'extract_products', 'extract_product_category_name_translation'
+        ]),
+        Stage('transform_cities', transforms.transform_cities, ['extract_cities']),
+        Stage(
+            'transform_orders', transform_orders, [orders, 'extract_customers', 'transform_cities'], **shard_options
+        ),
+        Stage('transform_timestamps', transforms.transform_timestamps, [order_items, orders]),
+        Stage('transform_reviews', transforms.transform_reviews, [reviews]),
+        Stage('review_keys', project, ['transform_reviews'], columns=['review_id', 'order_id']),
+    ]
+    if stream:
+        stages.append(Stage('transform_order_items', stream_order_items, [
+            'extract_sellers', 'transform_cities', 'transform_orders', 'review_keys'
+        ], engine=engine))
+    else:
+        stages.append(Stage('transform_order_items', transform_order_items, [
+            order_items, 'extract_sellers', 'transform_cities', 'transform_orders', 'review_keys'
+        ], **shard_options))
+
+    table_inputs = [
+        'transform_products', 'transform_cities', 'transform_timestamps', 'transform_reviews', 'transform_order_items'
+    ]
+    if surrogate_keys:
+        from etl.surrogate import surrogate_tables
+
+        stages.append(Stage('warehouse_tables', surrogate_tables, table_inputs))
+    else:
+        stages.append(Stage('warehouse_tables', warehouse_tables, table_inputs))
+
+    stages.append(Stage(
+        'validate', validate_tables, ['warehouse_tables'], policy=on_violation, surrogate_keys=surrogate_keys
+    ))
+
+    aggregate_inputs = []
+    if aggregates is not None:
+        stages.append(Stage('aggregates', build_aggregates, [
+            'transform_order_items', 'transform_products', 'transform_orders'
+        ], names=aggregates or None))
+        aggregate_inputs = ['aggregates']
+
+    if incremental:
+        stages.append(Stage('load', load_incremental, [
+            'validate', orders, 'watermark', 'order_fingerprints', 'loaded_fingerprints'
+        ] + aggregate_inputs))
+    else:
+        stages.append(Stage(
+            'load', load_full, ['validate', orders, 'order_fingerprints'] + aggregate_inputs,
+            surrogate_keys=surrogate_keys, deferred_constraints=deferred_constraints,
+            resumable=resumable, commit_rows=commit_rows
+        ))
+    return stages
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Brazilian e-commerce ETL pipeline")
+    parser.add_argument(
+        '--stages', nargs='+', metavar='STAGE',
+        help="run only these stages and the stages they depend on (default: everything except load)"
+    )
+    parser.add_argument('--force', nargs='+', default=[], metavar='STAGE', help="recompute these stages")
+    parser.add_argument('--force-all', action='store_true', help="recompute every selected stage")
+    parser.add_argument('--workers', type=int, default=4, help="number of stages run concurrently")
+    parser.add_argument('--load', action='store_true', help="drop, recreate and load the warehouse tables")
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="load only orders that are new or whose order, items or reviews changed since the last load"
+    )
+    parser.add_argument('--stream', action='store_true', help="stream order items into the load in chunks")
+    parser.add_argument(
+        '--engine', choices=list(ENGINES), default='pandas', help="backend that runs the transforms"
+    )
+    parser.add_argument(
+        '--shards', type=int, default=1,
+        help="split orders and order items by order_id into this many shards transformed in worker processes"
+    )
+    parser.add_argument('--shard-workers', type=int, help="worker processes for --shards (default: one per shard)")
+    parser.add_argument(
+        '--on-violation', choices=POLICIES, default='fail',
+        help="what to do with fact rows whose foreign keys are missing from the dimensions"
+    )
+    parser.add_argument(
+        '--deferred-constraints', action='store_true',
+        help="load into bare tables and build keys, foreign keys and the columnstore index afterwards"
+    )
+    parser.add_argument(
+        '--resumable', action='store_true',
+        help="commit the load in batches with checkpoints and resume an interrupted load of the same data"
+    )
+    parser.add_argument(
+        '--commit-rows', type=int, default=DEFAULT_COMMIT_ROWS, help="rows per committed batch with --resumable"
+    )
+    parser.add_argument(
+        '--aggregates', nargs='*', choices=list(AGGREGATES), metavar='TABLE',
+        help="build and load these summary tables, all of them when none are named"
+    )
+    parser.add_argument(
+        '--surrogate-keys', action='store_true',
+        help="load dimensions keyed on dense INT surrogate keys instead of the natural string keys"
+    )
+    parser.add_argument(
+        '--profile', nargs='+', default=[], metavar='STAGE', help="write a cProfile dump for these stages"
+    )
+    parser.add_argument('--report', type=Path, help="path of the JSON run report (default: reports/run-*.json)")
+    parser.add_argument('--list', action='store_true', help="list the stages and exit")
+    args = parser.parse_args(argv)
+    if args.stream and (args.incremental or not args.load):
+        parser.error("--stream needs --load and cannot be combined with --incremental")
+    if args.incremental and (args.surrogate_keys or args.deferred_constraints):
+        parser.error("--surrogate-keys and --deferred-constraints only support full loads")
+    if args.shards > 1 and args.engine != 'pandas':
+        parser.error("--shards runs the pandas transforms and cannot be combined with --engine")
+    if args.resumable and (args.incremental or args.stream or args.deferred_constraints):
+        parser.error("--resumable cannot be combined with --incremental, --stream or --deferred-constraints")
+    if args.aggregates is not None and (args.stream or args.on_violation != 'fail'):
+        parser.error("--aggregates needs the whole fact table and cannot be combined with --stream or --on-violation")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = build_stages(
+        args.incremental, args.stream, args.surrogate_keys, args.engine, args.on_violation, args.deferred_constraints,
+        args.resumable, args.commit_rows, args.shards, args.shard_workers, args.aggregates
+    )
+    if args.list:
+        for stage in stages:
+            print(f"{stage.name}: {', '.join(stage.inputs) or '-'}")
+        return {}
+
+    targets = args.stages
+    if targets is None:
+        load = args.load or args.incremental
+        targets = [stage.name for stage in stages if load or stage.name != 'load']
+    try:
+        return run_pipeline(
+            stages, targets, force=True if args.force_all else args.force, max_workers=args.workers,
+            profile=args.profile
+        )
+    finally:
+        report.write(args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# noinspection SqlNoDataSourceInspection
+DIALECTS = {
+    'mssql': {
+        'quote': '[{}]',
+        'types': {},
+        'drop_table': "IF OBJECT_ID('{table}', 'U') IS NOT NULL DROP TABLE {table};",
+        'primary_key': "ALTER TABLE {table} ADD CONSTRAINT PK_{table} PRIMARY KEY {kind} ({columns});",
+        'unique_key': "ALTER TABLE {table} ADD CONSTRAINT UQ_{table}_{name} UNIQUE ({columns});",
+        # WITH CHECK validates the loaded rows so the optimizer can trust the constraint
+        'foreign_key': (
+            "ALTER TABLE {table} WITH CHECK ADD CONSTRAINT {name} "
+            "FOREIGN KEY ({column}) REFERENCES {ref_table}({ref_column});"
+        ),
+        'columnstore': "CREATE CLUSTERED COLUMNSTORE INDEX CCI_{table} ON {table};",
+        'enforces_foreign_keys': True,
+    },
+    'sqlite': {
+        'quote': '"{}"',
+        'types': {'BIT': 'INTEGER'},
+        'drop_table': "DROP TABLE IF EXISTS {table};",
+        # SQLite cannot add constraints to an existing table, unique indexes stand in for keys
+        'primary_key': "CREATE UNIQUE INDEX PK_{table} ON {table} ({columns});",
+        'unique_key': "CREATE UNIQUE INDEX UQ_{table}_{name} ON {table} ({columns});",
+        'foreign_key': (
+            "SELECT COUNT(*) FROM {table} t LEFT JOIN {ref_table} r ON t.{column} = r.{ref_column} "
+            "WHERE t.{column} IS NOT NULL AND r.{ref_column} IS NULL;"
+        ),
+        'columnstore': None,
+        'enforces_foreign_keys': False,
+    },
+}
+
+
+def get_dialect(name: str) -> dict:
+    if name not in DIALECTS:
+        raise ValueError(f"Unknown dialect '{name}', expected one of: {', '.join(DIALECTS)}")
+    return DIALECTS[name]
+
+
+def drop_tables_sql(dialect: dict, model: dict) -> list[str]:
+    return [dialect['drop_table'].format(table=table) for table in reversed(list(model['columns']))]
+
+
+def create_heap_sql(dialect: dict, model: dict) -> list[str]:
+    statements = []
+    for table, columns in model['columns'].items():
+        definitions = ',\n'.join(
+            f"    {dialect['quote'].format(name)} {dialect['types'].get(sql_type, sql_type)} "
+            f"{'NULL' if nullable else 'NOT NULL'}"
+            for name, sql_type, nullable in columns
+        )
+        statements.append(f"CREATE TABLE {table}\n(\n{definitions}\n);")
+    return statements
+
+
+def post_load_sql(dialect: dict, model: dict) -> dict[str, list[str]]:
+    # The clustered columnstore goes first so building it does not rebuild the other indexes
+    if dialect['columnstore']:
+        indexes = [dialect['columnstore'].format(table=table) for table in model['columnstore']]
+    else:
+        indexes = [
+            f"CREATE INDEX IX_{table}_{column} ON {table} ({column});"
+            for table, column, _, _ in model['foreign_keys'].values()
+        ]
+
+    primary_keys = [
+        dialect['primary_key'].format(
+            table=table,
+            columns=', '.join(columns),
+            kind='NONCLUSTERED' if table in model['columnstore'] else 'CLUSTERED',
+        )
+        for table, columns in model['primary_keys'].items()
+    ]
+    primary_keys += [
+        dialect['unique_key'].format(table=table, name='_'.join(columns), columns=', '.join(columns))
+        for table, columns in model['unique_keys'].items()
+    ]
+
+    foreign_keys = [
+        dialect['foreign_key'].format(
+            name=constraint, table=table, column=column, ref_table=ref_table, ref_column=ref_column
+        )
+        for constraint, (table, column, ref_table, ref_column) in model['foreign_keys'].items()
+    ]
+    return {'indexes': indexes, 'primary_keys': primary_keys, 'foreign_keys': foreign_keys}
@@ -1,4 +1,7 @@
 DROP_TABLES_SQL = [
+    "IF OBJECT_ID('ETL_ORDER_FINGERPRINT', 'U') IS NOT NULL DROP TABLE ETL_ORDER_FINGERPRINT;",
+    "IF OBJECT_ID('ETL_LOAD_CHECKPOINT', 'U') IS NOT NULL DROP TABLE ETL_LOAD_CHECKPOINT;",
+    "IF OBJECT_ID('ETL_WATERMARK', 'U') IS NOT NULL DROP TABLE ETL_WATERMARK;",
     "IF OBJECT_ID('FACT_ORDER_ITEMS', 'U') IS NOT NULL DROP TABLE FACT_ORDER_ITEMS;",
     "IF OBJECT_ID('DIM_REVIEWS', 'U') IS NOT NULL DROP TABLE DIM_REVIEWS;",
     "IF OBJECT_ID('DIM_ORDERS', 'U') IS NOT NULL DROP TABLE dbo.DIM_ORDERS;",
@@ -0,0 +1,91 @@
+# noinspection SqlNoDataSourceInspection
+TABLE_KEYS = {
+    'DIM_PRODUCTS': ['product_id'],
+    'DIM_CITIES': ['city_id'],
+    'DIM_TIMESTAMP': ['timestamp'],
+    'DIM_REVIEWS': ['review_id'],
+    'FACT_ORDER_ITEMS': ['order_item_id'],
+    'ETL_ORDER_FINGERPRINT': ['order_id'],
+}
+
+UPSERT_TABLES = {'DIM_REVIEWS', 'FACT_ORDER_ITEMS', 'ETL_ORDER_FINGERPRINT'}
+
+# Tables holding a changed order's complete set of rows, so rows missing from staging were removed from the order
+ORDER_TABLES = {'FACT_ORDER_ITEMS'}
+
+READ_FINGERPRINTS_SQL = "SELECT order_id, fingerprint FROM ETL_ORDER_FINGERPRINT;"
+
+READ_WATERMARK_SQL = "SELECT value FROM ETL_WATERMARK WHERE name = ?;"
+
+WRITE_WATERMARK_SQL = """
+    MERGE ETL_WATERMARK WITH (HOLDLOCK) AS target
+    USING (SELECT ? AS name, ? AS value) AS source
+    ON target.name = source.name
+    WHEN MATCHED THEN
+        UPDATE SET target.value = source.value, target.updated_at = SYSUTCDATETIME()
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (name, value) VALUES (source.name, source.value);
+"""
+
+READ_CHECKPOINTS_SQL = "SELECT table_name, rows_loaded, batches FROM ETL_LOAD_CHECKPOINT WHERE run_id = ?;"
+
+WRITE_CHECKPOINT_SQL = """
+    MERGE ETL_LOAD_CHECKPOINT WITH (HOLDLOCK) AS target
+    USING (SELECT ? AS run_id, ? AS table_name, ? AS rows_loaded, ? AS batches) AS source
+    ON target.run_id = source.run_id AND target.table_name = source.table_name
+    WHEN MATCHED THEN
+        UPDATE SET target.rows_loaded = source.rows_loaded, target.batches = source.batches,
+                   target.updated_at = SYSUTCDATETIME()
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (run_id, table_name, rows_loaded, batches)
+        VALUES (source.run_id, source.table_name, source.rows_loaded, source.batches);
+"""
+
+WRITE_CHECKPOINT_SQLITE_SQL = """
+    INSERT INTO ETL_LOAD_CHECKPOINT (run_id, table_name, rows_loaded, batches) VALUES (?, ?, ?, ?)
+    ON CONFLICT (run_id, table_name) DO UPDATE
+    SET rows_loaded = excluded.rows_loaded, batches = excluded.batches, updated_at = CURRENT_TIMESTAMP;
+"""
+
+CLEAR_CHECKPOINTS_SQL = "DELETE FROM ETL_LOAD_CHECKPOINT WHERE run_id = ?;"
+
+
+def staging_table(table_name: str) -> str:
+    return f"#STG_{table_name}"
+
+
+def create_staging_sql(table_name: str) -> str:
+    staging = staging_table(table_name)
+    return (
+        f"IF OBJECT_ID('tempdb..{staging}') IS NOT NULL DROP TABLE {staging}; "
+        f"SELECT TOP 0 * INTO {staging} FROM {table_name};"
+    )
+
+
+def drop_staging_sql(table_name: str) -> str:
+    return f"DROP TABLE {staging_table(table_name)};"
+
+
+def merge_sql(table_name: str, columns) -> str:
+    keys = TABLE_KEYS[table_name]
+    on = ' AND '.join(f"target.[{key}] = source.[{key}]" for key in keys)
+    insert_columns = ', '.join(f"[{col}]" for col in columns)
+    insert_values = ', '.join(f"source.[{col}]" for col in columns)
+    sql = (
+        f"MERGE {table_name} WITH (HOLDLOCK) AS target "
+        f"USING {staging_table(table_name)} AS source "
+        f"ON {on} "
+    )
+    if table_name in UPSERT_TABLES:
+        updates = ', '.join(f"target.[{col}] = source.[{col}]" for col in columns if col not in keys)
+        sql += f"WHEN MATCHED THEN UPDATE SET {updates} "
+    return sql + f"WHEN NOT MATCHED BY TARGET THEN INSERT ({insert_columns}) VALUES ({insert_values});"
+
+
+def prune_sql(table_name: str) -> str:
+    matched = ' AND '.join(f"source.[{key}] = target.[{key}]" for key in TABLE_KEYS[table_name])
+    return (
+        f"DELETE target FROM {table_name} AS target "
+        f"WHERE target.[order_id] IN (SELECT order_id FROM {staging_table('ETL_ORDER_FINGERPRINT')}) "
+        f"AND NOT EXISTS (SELECT 1 FROM {staging_table(table_name)} AS source WHERE {matched});"
+    )
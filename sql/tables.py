@@ -0,0 +1,159 @@
+# Star schema as data, for loads that create bare tables first and add keys and indexes afterwards.
+# Mirrors CREATE_TABLES_SQL and CREATE_TABLES_SURROGATE_SQL in sql/create_tables.py.
+# Columns are (name, type, nullable).
+COLUMNS = {
+    'DIM_CITIES': [
+        ('city_id', 'VARCHAR(50)', False),
+        ('city_name', 'VARCHAR(100)', False),
+        ('state_code', 'CHAR(2)', False),
+        ('is_capital', 'BIT', False),
+        ('ibge_res_pop', 'INT', True),
+        ('ibge_res_pop_bras', 'INT', True),
+        ('ibge_res_pop_estr', 'INT', True),
+        ('ibge_du', 'INT', True),
+        ('ibge_du_urban', 'INT', True),
+        ('ibge_du_rural', 'INT', True),
+        ('ibge_pop', 'INT', True),
+    ],
+    'DIM_PRODUCTS': [
+        ('product_id', 'VARCHAR(50)', False),
+        ('product_category_name', 'VARCHAR(255)', True),
+        ('product_category_name_english', 'VARCHAR(255)', True),
+        ('product_name_length', 'INT', True),
+        ('product_description_length', 'INT', True),
+        ('product_photos_qty', 'INT', True),
+        ('product_weight_g', 'INT', True),
+        ('product_length_cm', 'INT', True),
+        ('product_height_cm', 'INT', True),
+        ('product_width_cm', 'INT', True),
+    ],
+    'DIM_TIMESTAMP': [
+        ('timestamp', 'VARCHAR(10)', False),
+        ('year', 'INT', False),
+        ('month', 'INT', False),
+        ('day', 'INT', False),
+        ('hour', 'INT', False),
+    ],
+    'DIM_REVIEWS': [
+        ('review_id', 'VARCHAR(50)', False),
+        ('order_id', 'VARCHAR(50)', False),
+        ('review_score', 'INT', True),
+        ('review_comment_title_length', 'INT', False),
+        ('review_comment_message_length', 'INT', False),
+    ],
+    'FACT_ORDER_ITEMS': [
+        ('order_item_id', 'VARCHAR(50)', False),
+        ('order_item_position', 'INT', True),
+        ('order_id', 'VARCHAR(50)', False),
+        ('product_id', 'VARCHAR(50)', False),
+        ('review_id', 'VARCHAR(50)', True),
+        ('seller_id', 'VARCHAR(50)', True),
+        ('seller_city_id', 'VARCHAR(50)', True),
+        ('shipping_limit_timestamp', 'VARCHAR(10)', True),
+        ('price', 'DECIMAL(12,2)', True),
+        ('freight_value', 'DECIMAL(12,2)', True),
+        ('customer_unique_id', 'VARCHAR(50)', True),
+        ('customer_city_id', 'VARCHAR(50)', True),
+        ('order_status', 'VARCHAR(50)', True),
+        ('order_purchase_timestamp', 'VARCHAR(10)', True),
+        ('order_approved_timestamp', 'VARCHAR(10)', True),
+        ('order_delivered_carrier_timestamp', 'VARCHAR(10)', True),
+        ('order_delivered_customer_timestamp', 'VARCHAR(10)', True),
+        ('order_estimated_delivery_timestamp', 'VARCHAR(10)', True),
+    ],
+}
+
+PRIMARY_KEYS = {
+    'DIM_CITIES': ['city_id'],
+    'DIM_PRODUCTS': ['product_id'],
+    'DIM_TIMESTAMP': ['timestamp'],
+    'DIM_REVIEWS': ['review_id'],
+    'FACT_ORDER_ITEMS': ['order_item_id'],
+}
+
+# Constraint -> (table, column, referenced table, referenced column)
+FOREIGN_KEYS = {
+    'FK_ORDERS_City': ('FACT_ORDER_ITEMS', 'customer_city_id', 'DIM_CITIES', 'city_id'),
+    'FK_FACT_ORDERITEMS_Products': ('FACT_ORDER_ITEMS', 'product_id', 'DIM_PRODUCTS', 'product_id'),
+    'FK_FACT_ORDERITEMS_Cities': ('FACT_ORDER_ITEMS', 'seller_city_id', 'DIM_CITIES', 'city_id'),
+    'FK_FACT_ORDERITEMS_Reviews': ('FACT_ORDER_ITEMS', 'review_id', 'DIM_REVIEWS', 'review_id'),
+    'FK_FACT_ORDERITEMS_Timestamp_Purchase': (
+        'FACT_ORDER_ITEMS', 'order_purchase_timestamp', 'DIM_TIMESTAMP', 'timestamp'
+    ),
+    'FK_FACT_ORDERITEMS_Timestamp_Approved': (
+        'FACT_ORDER_ITEMS', 'order_approved_timestamp', 'DIM_TIMESTAMP', 'timestamp'
+    ),
+    'FK_FACT_ORDERITEMS_Timestamp_Delivered_Carrier': (
+        'FACT_ORDER_ITEMS', 'order_delivered_carrier_timestamp', 'DIM_TIMESTAMP', 'timestamp'
+    ),
+    'FK_FACT_ORDERITEMS_Timestamp_Delivered_Customer': (
+        'FACT_ORDER_ITEMS', 'order_delivered_customer_timestamp', 'DIM_TIMESTAMP', 'timestamp'
+    ),
+    'FK_FACT_ORDERITEMS_Timestamp_Estimated_Delivery': (
+        'FACT_ORDER_ITEMS', 'order_estimated_delivery_timestamp', 'DIM_TIMESTAMP', 'timestamp'
+    ),
+    'FK_FACT_ORDERITEMS_Shipping_Limit': (
+        'FACT_ORDER_ITEMS', 'shipping_limit_timestamp', 'DIM_TIMESTAMP', 'timestamp'
+    ),
+}
+
+# Tables that get a columnstore index for analytic scans
+COLUMNSTORE_TABLES = ['FACT_ORDER_ITEMS']
+
+# Dimension -> (natural key, surrogate key); fact natural column -> surrogate column
+SURROGATE_KEYS = {
+    'DIM_CITIES': ('city_id', 'city_key'),
+    'DIM_PRODUCTS': ('product_id', 'product_key'),
+    'DIM_REVIEWS': ('review_id', 'review_key'),
+}
+SURROGATE_FACT_COLUMNS = {
+    'product_id': 'product_key',
+    'review_id': 'review_key',
+    'seller_city_id': 'seller_city_key',
+    'customer_city_id': 'customer_city_key',
+}
+
+
+def surrogate_column(name: str, sql_type: str, nullable: bool) -> tuple:
+    if name in SURROGATE_FACT_COLUMNS:
+        return SURROGATE_FACT_COLUMNS[name], 'INT', nullable
+    if name.endswith('_timestamp'):
+        return name, 'INT', nullable
+    return name, sql_type, nullable
+
+
+def table_model(surrogate_keys: bool = False) -> dict:
+    if not surrogate_keys:
+        return {
+            'columns': COLUMNS,
+            'primary_keys': PRIMARY_KEYS,
+            'unique_keys': {},
+            'foreign_keys': FOREIGN_KEYS,
+            'columnstore': COLUMNSTORE_TABLES,
+        }
+
+    columns = {}
+    for table, table_columns in COLUMNS.items():
+        if table in SURROGATE_KEYS:
+            columns[table] = [(SURROGATE_KEYS[table][1], 'INT', False)] + table_columns
+        elif table == 'DIM_TIMESTAMP':
+            columns[table] = [('timestamp', 'INT', False)] + table_columns[1:]
+        else:
+            columns[table] = [surrogate_column(*column) for column in table_columns]
+
+    foreign_keys = {}
+    for constraint, (table, column, ref_table, ref_column) in FOREIGN_KEYS.items():
+        if ref_table in SURROGATE_KEYS:
+            column, ref_column = SURROGATE_FACT_COLUMNS[column], SURROGATE_KEYS[ref_table][1]
+        foreign_keys[constraint] = (table, column, ref_table, ref_column)
+
+    return {
+        'columns': columns,
+        'primary_keys': {
+            table: [SURROGATE_KEYS[table][1]] if table in SURROGATE_KEYS else keys
+            for table, keys in PRIMARY_KEYS.items()
+        },
+        'unique_keys': {table: [natural] for table, (natural, _) in SURROGATE_KEYS.items()},
+        'foreign_keys': foreign_keys,
+        'columnstore': COLUMNSTORE_TABLES,
+    }
@@ -0,0 +1,50 @@
+import pytest
+
+import etl.cache
+import etl.extract
+from bench.generate import generate
+from bench.run import CSV_FILES
+from etl.extract import extract_csv
+from etl.pipeline import run_pipeline
+from etl.transform import transform_cities, transform_orders, transform_reviews
+from process import build_stages
+
+
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('data')
+    generate(path, scale=0.01)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def local_paths(data_dir, tmp_path, monkeypatch):
+    # Every test reads the generated data and gets a cache of its own
+    monkeypatch.setattr(etl.extract, 'data_path', data_dir)
+    monkeypatch.setattr(etl.cache, 'cache_path', tmp_path / 'cache')
+
+
+@pytest.fixture
+def raw() -> dict:
+    return {
+        name: extract_csv(file_name, cache=False, delimiter=delimiter)
+        for name, (file_name, delimiter) in CSV_FILES.items()
+    }
+
+
+@pytest.fixture
+def inputs(raw) -> dict:
+    cities = transform_cities.__wrapped__(raw['cities'])
+    return {
+        **raw,
+        'transformed_cities': cities,
+        'transformed_orders': transform_orders.__wrapped__(raw['orders'], raw['customers'], cities),
+        'review_keys': transform_reviews.__wrapped__(raw['reviews'])[['review_id', 'order_id']],
+    }
+
+
+@pytest.fixture
+def run_stages():
+    def run(targets: list[str], **options) -> dict:
+        return run_pipeline(build_stages(**options), targets)
+    return run
@@ -0,0 +1,84 @@
+import sqlite3
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from etl.aggregates import AGGREGATES, aggregate_model
+from etl.load import create_heap_tables, load_df_to_table, refresh_aggregates, verify_aggregates
+from etl.pipeline import run_pipeline
+from process import build_stages
+from sql.dialects import get_dialect
+from sql.tables import table_model
+
+sqlite3.register_adapter(Decimal, str)
+
+
+@pytest.fixture
+def loaded(run_stages):
+    results = run_stages(['validate', 'aggregates', 'order_fingerprints'], aggregates=[])
+    dialect = get_dialect('sqlite')
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.cursor()
+    create_heap_tables(cursor, dialect, table_model())
+    create_heap_tables(cursor, dialect, aggregate_model())
+    for table_name, df in results['validate'].items():
+        load_df_to_table(cursor, df, table_name)
+    refresh_aggregates(cursor, results['aggregates'])
+    return conn, results
+
+
+def table_rows(conn, table_name: str) -> pd.DataFrame:
+    df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def test_aggregates_match_the_fact_table(loaded):
+    conn, results = loaded
+    assert set(results['aggregates']) == set(AGGREGATES)
+    verify_aggregates(conn.cursor(), list(AGGREGATES))
+
+
+def test_delivery_states_come_from_the_customers(loaded, raw):
+    conn, _ = loaded
+    orders = raw['orders'].drop_duplicates(subset=['order_id']).merge(raw['customers'], on='customer_id')
+    expected = orders.groupby('customer_state', observed=True).size()
+    states = table_rows(conn, 'AGG_DELIVERY_STATE_MONTH').groupby('customer_state')['orders'].sum()
+    assert states.to_dict() == expected.to_dict()
+
+
+def test_refresh_is_idempotent(loaded):
+    conn, results = loaded
+    before = {table_name: table_rows(conn, table_name) for table_name in AGGREGATES}
+    refresh_aggregates(conn.cursor(), results['aggregates'])
+    verify_aggregates(conn.cursor(), list(AGGREGATES))
+    for table_name in AGGREGATES:
+        pd.testing.assert_frame_equal(table_rows(conn, table_name), before[table_name])
+
+
+def test_verify_catches_drift(loaded):
+    conn, _ = loaded
+    conn.execute("UPDATE AGG_SALES_CATEGORY_MONTH SET revenue_cents = revenue_cents + 1 WHERE rowid = 1")
+    with pytest.raises(ValueError, match='AGG_SALES_CATEGORY_MONTH.revenue_cents'):
+        verify_aggregates(conn.cursor(), list(AGGREGATES))
+
+
+def test_incremental_refresh_replaces_whole_months(loaded):
+    conn, results = loaded
+    before = {table_name: table_rows(conn, table_name) for table_name in AGGREGATES}
+
+    # Fifty orders look new, so every month from the earliest of theirs is rebuilt and replaced
+    fingerprints = results['order_fingerprints']
+    stages = build_stages(incremental=True, aggregates=[])
+    for stage in stages:
+        if stage.name == 'watermark':
+            stage.func = lambda: None
+        elif stage.name == 'loaded_fingerprints':
+            stage.func = lambda: fingerprints.iloc[:-50]
+    incremental = run_pipeline(stages, ['aggregates', 'new_orders'])
+    assert 50 <= len(incremental['new_orders']) < len(fingerprints)
+
+    refresh_aggregates(conn.cursor(), incremental['aggregates'])
+    verify_aggregates(conn.cursor(), list(AGGREGATES))
+    for table_name in AGGREGATES:
+        pd.testing.assert_frame_equal(table_rows(conn, table_name), before[table_name])
@@ -0,0 +1,31 @@
+from etl.changes import changed_fingerprints, order_fingerprints
+from sql.merge_tables import merge_sql, prune_sql
+
+
+def changed_order_ids(raw: dict, **updates) -> set:
+    before = order_fingerprints(raw['orders'], raw['order_items'], raw['reviews'])
+    after = order_fingerprints(**{
+        'raw_orders': raw['orders'], 'raw_order_items': raw['order_items'], 'raw_reviews': raw['reviews'], **updates
+    })
+    return set(changed_fingerprints(after, before)['order_id'])
+
+
+def test_review_update_changes_its_order(raw):
+    reviews = raw['reviews'].copy()
+    reviews.loc[reviews.index[0], 'review_comment_message'] = 'updated'
+    assert changed_order_ids(raw, raw_reviews=reviews) == {reviews['order_id'].iloc[0]}
+
+
+def test_removed_item_changes_its_order(raw):
+    items = raw['order_items']
+    assert changed_order_ids(raw, raw_order_items=items.iloc[1:]) == {items['order_id'].iloc[0]}
+
+
+def test_reviews_are_upserted():
+    assert 'WHEN MATCHED THEN UPDATE SET' in merge_sql('DIM_REVIEWS', ['review_id', 'order_id', 'review_score'])
+
+
+def test_prune_is_scoped_to_changed_orders():
+    sql = prune_sql('FACT_ORDER_ITEMS')
+    assert sql.startswith('DELETE target FROM FACT_ORDER_ITEMS')
+    assert '#STG_ETL_ORDER_FINGERPRINT' in sql and 'NOT EXISTS (SELECT 1 FROM #STG_FACT_ORDER_ITEMS' in sql
@@ -0,0 +1,84 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+import etl.checkpoint
+from etl.checkpoint import (
+    clear_checkpoints, load_run_id, load_star_schema_resumable, read_checkpoints, verify_row_counts
+)
+from etl.db import ConnectionPool
+from etl.load import create_heap_tables
+from sql.dialects import get_dialect
+from sql.tables import table_model
+
+sqlite3.register_adapter(Decimal, str)
+
+CREATE_CHECKPOINT_TABLE_SQL = """
+    CREATE TABLE ETL_LOAD_CHECKPOINT
+    (
+        run_id TEXT NOT NULL,
+        table_name TEXT NOT NULL,
+        rows_loaded INTEGER NOT NULL,
+        batches INTEGER NOT NULL,
+        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (run_id, table_name)
+    );
+"""
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = tmp_path / 'load.db'
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), max_size=2)
+    with pool.connection() as conn:
+        create_heap_tables(conn.cursor(), get_dialect('sqlite'), table_model())
+        conn.execute(CREATE_CHECKPOINT_TABLE_SQL)
+        conn.commit()
+    yield pool
+    pool.close()
+
+
+def test_resume_after_crash(run_stages, pool, monkeypatch):
+    tables = run_stages(['validate'])['validate']
+    run_id, commit_rows = load_run_id(tables), len(tables['FACT_ORDER_ITEMS']) // 4 + 1
+    bulk_load, fact_batches = etl.checkpoint.bulk_load, []
+
+    def crash_mid_fact(cursor, df, table_name, *args):
+        if table_name == 'FACT_ORDER_ITEMS':
+            fact_batches.append(len(df))
+            if len(fact_batches) == 3:
+                raise Crash()
+        return bulk_load(cursor, df, table_name, *args)
+
+    monkeypatch.setattr(etl.checkpoint, 'bulk_load', crash_mid_fact)
+    with pytest.raises(Crash):
+        load_star_schema_resumable(pool, tables, run_id, {}, commit_rows)
+
+    with pool.connection() as conn:
+        checkpoints = read_checkpoints(conn.cursor(), run_id)
+    assert checkpoints['FACT_ORDER_ITEMS'] == (2 * commit_rows, 2)
+    assert checkpoints['DIM_PRODUCTS'][0] == len(tables['DIM_PRODUCTS'])
+
+    monkeypatch.setattr(etl.checkpoint, 'bulk_load', bulk_load)
+    load_star_schema_resumable(pool, tables, run_id, checkpoints, commit_rows)
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        verify_row_counts(cursor, tables)
+        assert read_checkpoints(cursor, run_id)['FACT_ORDER_ITEMS'] == (len(tables['FACT_ORDER_ITEMS']), 4)
+        clear_checkpoints(cursor, run_id)
+        conn.commit()
+        assert read_checkpoints(cursor, run_id) == {}
+
+
+def test_verify_row_counts_detects_missing_rows(run_stages, pool):
+    tables = run_stages(['validate'])['validate']
+    load_star_schema_resumable(pool, tables, load_run_id(tables), {})
+    with pool.connection() as conn:
+        conn.execute("DELETE FROM FACT_ORDER_ITEMS WHERE rowid IN (SELECT rowid FROM FACT_ORDER_ITEMS LIMIT 1)")
+        with pytest.raises(etl.checkpoint.VerificationError, match='FACT_ORDER_ITEMS'):
+            verify_row_counts(conn.cursor(), tables)
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from bench.conformance import check, run_engine
+from etl.cache import source_fingerprint
+from etl.engines import ENGINES, get_engine
+
+OTHER_ENGINES = [name for name in ENGINES if name != 'pandas']
+
+
+@pytest.mark.parametrize('engine', OTHER_ENGINES)
+def test_engine_matches_pandas(engine, raw):
+    pytest.importorskip(engine)
+    assert check(run_engine(get_engine('pandas'), raw), run_engine(get_engine(engine), raw)) == []
+
+
+@pytest.mark.parametrize('engine', OTHER_ENGINES)
+def test_engine_keeps_the_first_of_repeated_customers(engine, raw):
+    pytest.importorskip(engine)
+    customers = raw['customers']
+    repeated = customers.iloc[:5].assign(customer_state='XX')
+    raw = {**raw, 'customers': pd.concat([customers, repeated], ignore_index=True)}
+    outputs = run_engine(get_engine('pandas'), raw)
+    assert 'XX' not in set(outputs['transform_orders'][0]['customer_state'])
+    assert check(outputs, run_engine(get_engine(engine), raw)) == []
+
+
+@pytest.mark.parametrize('engine', OTHER_ENGINES)
+@pytest.mark.parametrize('helper', ['transform.py', 'cities.py', 'schema.py'])
+def test_engine_cache_keys_follow_shared_helpers(engine, helper, monkeypatch):
+    pytest.importorskip(engine)
+    transform_order_items = get_engine(engine).transform_order_items
+    before = source_fingerprint(transform_order_items)
+
+    read_bytes = Path.read_bytes
+    monkeypatch.setattr(Path, 'read_bytes', lambda path: read_bytes(path) + b'#' * (path.name == helper))
+    assert source_fingerprint(transform_order_items) != before
@@ -0,0 +1,47 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from etl.load import build_post_load, create_heap_tables, load_df_to_table
+from etl.validate import IntegrityError
+from sql.dialects import get_dialect
+from sql.tables import table_model
+
+sqlite3.register_adapter(Decimal, str)
+
+
+def load_deferred(tables: dict, surrogate_keys: bool = False) -> sqlite3.Connection:
+    dialect, model = get_dialect('sqlite'), table_model(surrogate_keys)
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.cursor()
+    create_heap_tables(cursor, dialect, model)
+    for table_name, df in tables.items():
+        load_df_to_table(cursor, df, table_name)
+    build_post_load(cursor, dialect, model)
+    return conn
+
+
+@pytest.mark.parametrize('surrogate_keys', [False, True])
+def test_deferred_load(run_stages, surrogate_keys):
+    tables = run_stages(['validate'], surrogate_keys=surrogate_keys)['validate']
+    conn = load_deferred(tables, surrogate_keys)
+    for table_name, df in tables.items():
+        assert conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0] == len(df)
+    indexes = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'PK_FACT_ORDER_ITEMS', 'PK_DIM_CITIES'} <= indexes
+
+
+def test_deferred_load_checks_foreign_keys(run_stages):
+    tables = run_stages(['validate'])['validate']
+    fact = tables['FACT_ORDER_ITEMS'].copy()
+    fact.loc[fact.index[0], 'product_id'] = 'missing-product'
+    with pytest.raises(IntegrityError, match='FK_FACT_ORDERITEMS_Products'):
+        load_deferred({**tables, 'FACT_ORDER_ITEMS': fact})
+
+
+def test_deferred_load_checks_primary_keys(run_stages):
+    tables = run_stages(['validate'])['validate']
+    fact = tables['FACT_ORDER_ITEMS']
+    with pytest.raises(sqlite3.IntegrityError):
+        load_deferred({**tables, 'FACT_ORDER_ITEMS': fact.iloc[[0, *range(len(fact))]]})
@@ -0,0 +1,33 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl.schema import cents_to_decimal, to_cents
+
+
+def as_decimal(amount: float) -> Decimal:
+    # What SQL Server stores for the amount in a DECIMAL(12,2) column
+    return Decimal(str(amount)).quantize(Decimal('0.01'), ROUND_HALF_UP)
+
+
+@pytest.mark.parametrize('amount', [
+    0.0, 0.285, 1.005, 0.125, 0.135, 2.675, 0.1 + 0.2, 19.99, 1234.565, 99999999.995, 9999999999.99,
+])
+def test_to_cents_rounds_like_decimal(amount):
+    cents = to_cents(pd.Series([amount]))
+    assert cents_to_decimal(cents.iloc[0]) == as_decimal(amount)
+
+
+def test_to_cents_keeps_missing_amounts():
+    cents = to_cents(pd.Series([1.005, np.nan, 0.285]))
+    assert str(cents.dtype) == 'Int64'
+    assert cents.isna().tolist() == [False, True, False]
+    assert [cents_to_decimal(value) for value in cents.dropna()] == [Decimal('1.01'), Decimal('0.29')]
+
+
+def test_to_cents_matches_decimal_on_three_decimal_amounts():
+    amounts = np.random.default_rng(0).integers(0, 10_000_000, 10_000) / 1000
+    cents = to_cents(pd.Series(amounts))
+    assert [cents_to_decimal(value) for value in cents] == [as_decimal(amount) for amount in amounts]
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from etl.cache import source_fingerprint
+from etl.shard import transform_order_items_sharded, transform_orders_sharded
+from etl.transform import transform_order_items, transform_orders
+
+
+def test_sharded_orders_match_serial(inputs):
+    args = (inputs['orders'], inputs['customers'], inputs['transformed_cities'])
+    pd.testing.assert_frame_equal(
+        transform_orders_sharded.__wrapped__(*args, shards=3, workers=2), transform_orders.__wrapped__(*args)
+    )
+
+
+def test_sharded_order_items_match_serial(inputs):
+    # Repeated source rows are dropped in the shards just as in the serial transform
+    order_items = pd.concat([inputs['order_items'], inputs['order_items'].iloc[[3, 7, 7]]], ignore_index=True)
+    args = (
+        order_items, inputs['sellers'], inputs['transformed_cities'], inputs['transformed_orders'],
+        inputs['review_keys'],
+    )
+    pd.testing.assert_frame_equal(
+        transform_order_items_sharded.__wrapped__(*args, shards=3, workers=2),
+        transform_order_items.__wrapped__(*args),
+    )
+
+
+@pytest.mark.parametrize('func', [transform_orders_sharded, transform_order_items_sharded])
+def test_sharded_cache_keys_follow_the_transforms(func, monkeypatch):
+    before = source_fingerprint(func)
+    read_bytes = Path.read_bytes
+    monkeypatch.setattr(Path, 'read_bytes', lambda path: read_bytes(path) + b'#' * (path.name == 'transform.py'))
+    assert source_fingerprint(func) != before
@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from etl.engines import get_engine
+from etl.extract import extract_csv_chunks
+
+
+def straddling_chunksize(order_items: pd.DataFrame) -> int:
+    # Ends the first chunk between two items of the same order
+    order_ids = order_items['order_id']
+    return int(order_ids.eq(order_ids.shift()).fillna(False).to_numpy(dtype=bool).argmax())
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'duckdb'])
+def test_chunked_order_items_match_batch(inputs, engine):
+    transforms = get_engine(engine)
+    chunksize = straddling_chunksize(inputs['order_items'])
+    chunks = list(extract_csv_chunks("order_items.csv", chunksize=chunksize))
+    split_order = inputs['order_items']['order_id'].iloc[chunksize]
+    assert split_order in set(chunks[0]['order_id']) and split_order in set(chunks[1]['order_id'])
+
+    lookups = (
+        inputs['sellers'], inputs['transformed_cities'], inputs['transformed_orders'], inputs['review_keys']
+    )
+    streamed = pd.concat(list(transforms.transform_order_items_chunks(chunks, *lookups)), ignore_index=True)
+    batch = transforms.transform_order_items.__wrapped__(inputs['order_items'], *lookups)
+    pd.testing.assert_frame_equal(streamed, batch.reset_index(drop=True))
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+import etl.validate
+from etl.validate import IntegrityError, validate_tables
+
+
+def with_orphan(tables: dict, column: str, value) -> dict:
+    fact = tables['FACT_ORDER_ITEMS'].copy()
+    fact.loc[fact.index[0], column] = value
+    return {**tables, 'FACT_ORDER_ITEMS': fact}
+
+
+@pytest.mark.parametrize('surrogate_keys', [False, True])
+def test_clean_tables_pass(run_stages, surrogate_keys):
+    tables = run_stages(['warehouse_tables'], surrogate_keys=surrogate_keys)['warehouse_tables']
+    validated = validate_tables(tables, surrogate_keys=surrogate_keys)
+    pd.testing.assert_frame_equal(validated['FACT_ORDER_ITEMS'], tables['FACT_ORDER_ITEMS'])
+
+
+@pytest.mark.parametrize('surrogate_keys, column, value', [
+    (False, 'product_id', 'missing-product'),
+    (True, 'product_key', 10 ** 6),
+])
+def test_orphans_fail_the_load(run_stages, surrogate_keys, column, value):
+    tables = run_stages(['warehouse_tables'], surrogate_keys=surrogate_keys)['warehouse_tables']
+    with pytest.raises(IntegrityError) as error:
+        validate_tables(with_orphan(tables, column, value), surrogate_keys=surrogate_keys)
+    assert [(v['constraint'], v['violations']) for v in error.value.violations] == [
+        ('FK_FACT_ORDERITEMS_Products', 1)
+    ]
+
+
+def test_orphans_are_quarantined(run_stages, tmp_path, monkeypatch):
+    monkeypatch.setattr(etl.validate, 'reports_path', tmp_path)
+    tables = run_stages(['warehouse_tables'])['warehouse_tables']
+    validated = validate_tables(with_orphan(tables, 'product_id', 'missing-product'), policy='quarantine')
+    assert len(validated['FACT_ORDER_ITEMS']) == len(tables['FACT_ORDER_ITEMS']) - 1
+    assert len(pd.read_csv(next(tmp_path.glob('quarantine-*.csv')))) == 1